@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import User
+from .models import User, OutboundEmail
 
 
-admin.site.register(User)
\ No newline at end of file
+admin.site.register(User)
+admin.site.register(OutboundEmail)
\ No newline at end of file
@@ -0,0 +1,32 @@
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.views import exception_handler as drf_exception_handler
+
+from .hashing import HashingUnavailable
+
+
+class ServiceUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = HashingUnavailable.message
+    default_code = 'hashing_unavailable'
+
+
+def exception_handler(exc, context):
+    """DRF's handler, answering a saturated password hasher with a 503."""
+    if isinstance(exc, HashingUnavailable):
+        exc = ServiceUnavailable(exc.message)
+    return drf_exception_handler(exc, context)
+
+
+class HashingUnavailableMiddleware(MiddlewareMixin):
+    """
+    503 for views that hash passwords without handling HashingUnavailable
+    themselves (the admin login, allauth, Django's auth views).
+    """
+    def process_exception(self, request, exception):
+        if isinstance(exception, HashingUnavailable):
+            return HttpResponse(
+                exception.message, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content_type='text/plain; charset=utf-8')
@@ -1,8 +1,10 @@
-import threading
 from django import forms
+from django.template import loader
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import PasswordResetForm
 
+from .mail import queue_mail
+
 User = get_user_model()
 
 
@@ -96,10 +98,9 @@ class ChangePasswordForm(forms.Form):
         return new_password1
 
 
-class SendEmailForm(PasswordResetForm, threading.Thread):
+class SendEmailForm(PasswordResetForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        threading.Thread.__init__(self)
         for field in self.fields:
             self.fields[field].widget.attrs.update({"class": "form-control"})
 
@@ -109,24 +110,15 @@ class SendEmailForm(PasswordResetForm, threading.Thread):
 
         return self.cleaned_data.get('email')
 
-    def run(self) -> None:
-        return super().send_mail(
-            self.subject_template_name,
-            self.email_template_name,
-            self.context,
-            self.from_email,
-            self.to_email,
-            self.html_email_template_name,
-        )
-
-    def send_mail(self, subject_template_name, email_template_name, context, from_email, to_email, html_email_template_name):
-        self.subject_template_name = subject_template_name
-        self.email_template_name = email_template_name
-        self.context = context
-        self.from_email = from_email
-        self.to_email = to_email
-        self.html_email_template_name = html_email_template_name
-        self.start()
+    def send_mail(self, subject_template_name, email_template_name, context, from_email, to_email, html_email_template_name=None):
+        subject = loader.render_to_string(subject_template_name, context)
+        subject = ''.join(subject.splitlines())
+        body = loader.render_to_string(email_template_name, context)
+        html_body = None
+        if html_email_template_name is not None:
+            html_body = loader.render_to_string(html_email_template_name, context)
+
+        queue_mail(subject, body, from_email, [to_email], html_message=html_body)
 
 
 class ResetPasswordConfirmForm(forms.Form):
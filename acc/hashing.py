@@ -0,0 +1,91 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class HashingUnavailable(Exception):
+    """
+    Every hashing slot stayed busy for PASSWORD_HASHING_QUEUE_TIMEOUT.
+    Web callers answer 503 (see acc.exceptions); the message is safe to show.
+    """
+    message = 'Too many sign-in attempts are being processed, try again shortly.'
+
+    def __init__(self, message=None):
+        if message is not None:
+            self.message = message
+        super().__init__(self.message)
+
+
+_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+_slots = None
+
+
+def _encode(password, salt, iterations):
+    return PBKDF2PasswordHasher().encode(password, salt, iterations)
+
+
+def get_slots():
+    global _slots
+    with _lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(
+                getattr(settings, 'PASSWORD_HASHING_QUEUE_SIZE', 32))
+        return _slots
+
+
+def get_executor():
+    """The per-process hashing pool, or None when hashing runs inline."""
+    global _executor, _executor_pid
+    workers = getattr(settings, 'PASSWORD_HASHING_WORKERS', 0)
+    if not workers:
+        return None
+    with _lock:
+        # A pool inherited through fork() (e.g. gunicorn workers) is unusable.
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(max_workers=workers)
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def reset_executor():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def run_hash(password, salt, iterations):
+    slots = get_slots()
+    if not slots.acquire(timeout=getattr(settings, 'PASSWORD_HASHING_QUEUE_TIMEOUT', 2)):
+        raise HashingUnavailable()
+    try:
+        executor = get_executor()
+        if executor is None:
+            return _encode(password, salt, iterations)
+        try:
+            return executor.submit(_encode, password, salt, iterations).result()
+        except BrokenProcessPool:
+            reset_executor()
+            return _encode(password, salt, iterations)
+    finally:
+        slots.release()
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 hasher that caps concurrent hashes at PASSWORD_HASHING_QUEUE_SIZE
+    per process and, with PASSWORD_HASHING_WORKERS set, runs them in a
+    process pool. Produces the same ``pbkdf2_sha256`` hashes, so every
+    existing password keeps verifying.
+    """
+
+    def encode(self, password, salt, iterations=None):
+        self._check_encode_args(password, salt)
+        return run_hash(password, salt, iterations or self.iterations)
@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+def queue_mail(subject, message, from_email, recipient_list, html_message=None):
+    """
+    Drop-in for ``send_mail`` that only records the message in the outbox;
+    ``manage.py send_queued_mail`` delivers it.
+    """
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        html_body=html_message,
+        from_email=from_email,
+        to=list(recipient_list),
+    )
+
+
+def build_message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email, email.to, connection=connection)
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'EMAIL_OUTBOX_BACKOFF', 60)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def claim(batch_size, now):
+    """
+    Lease up to ``batch_size`` due messages to this worker: their next
+    attempt is pushed past ``EMAIL_OUTBOX_LEASE``, so other workers skip
+    them while they are being sent and pick them up again if this one dies.
+    The row locks are only held for this short transaction.
+    """
+    lease = timedelta(seconds=getattr(settings, 'EMAIL_OUTBOX_LEASE', 600))
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects
+            .filter(status=OutboundEmail.PENDING, next_attempt_at__lte=now)
+            .select_for_update(skip_locked=True)[:batch_size]
+        )
+        for email in batch:
+            email.attempts += 1
+            email.next_attempt_at = now + lease
+        OutboundEmail.objects.bulk_update(batch, ['attempts', 'next_attempt_at'])
+    return batch
+
+
+def record_failure(email, error, now, max_attempts):
+    email.last_error = repr(error)
+    if email.attempts >= max_attempts:
+        email.status = OutboundEmail.FAILED
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+
+
+def send_queued(batch_size=100):
+    """
+    Deliver one batch of due messages over a single SMTP connection.
+
+    Rows are claimed first (see ``claim``) and sent outside any transaction,
+    so several workers can drain the outbox together. Failures, including
+    not reaching the SMTP server at all, are retried with exponential
+    backoff until ``EMAIL_OUTBOX_MAX_ATTEMPTS`` is reached. Returns
+    ``(sent, failed)``.
+    """
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    now = timezone.now()
+    sent = failed = 0
+
+    batch = claim(batch_size, now)
+    if not batch:
+        return 0, 0
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for email in batch:
+            record_failure(email, e, now, max_attempts)
+        failed = len(batch)
+    else:
+        try:
+            for email in batch:
+                try:
+                    build_message(email, connection).send()
+                except Exception as e:
+                    failed += 1
+                    record_failure(email, e, now, max_attempts)
+                    # The connection may be broken; start the next message on a fresh one.
+                    connection.close()
+                else:
+                    sent += 1
+                    email.status = OutboundEmail.SENT
+                    email.sent_at = timezone.now()
+                    email.last_error = None
+        finally:
+            connection.close()
+
+    OutboundEmail.objects.bulk_update(
+        batch, ['status', 'next_attempt_at', 'last_error', 'sent_at'])
+    return sent, failed
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from acc.mail import send_queued
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbound emails."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--every', type=int, metavar='SECONDS',
+                            help="Keep running, polling the outbox every SECONDS seconds.")
+
+    def drain(self, batch_size):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_queued(batch_size)
+            if not sent and not failed:
+                break
+            total_sent += sent
+            total_failed += failed
+            if not sent:
+                # Everything left in this pass is failing; wait for the backoff.
+                break
+        if total_sent or total_failed:
+            self.stdout.write(f"Sent {total_sent} emails, {total_failed} failed attempts.")
+
+    def handle(self, *args, **options):
+        self.drain(options['batch_size'])
+        while options['every']:
+            time.sleep(options['every'])
+            self.drain(options['batch_size'])
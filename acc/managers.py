@@ -1,7 +1,34 @@
 from django.contrib.auth.base_user import BaseUserManager
+from django.db.models import Case, Q, Value, When
 
 
 class UserManager(BaseUserManager):
+    def find_by_email_or_username(self, identifier):
+        """
+        Resolve a login identifier with one query.
+
+        Matching is case-insensitive (served by the UPPER() indexes on User),
+        so "Alice@Example.com" logs in the account registered as
+        "alice@example.com"; before, email and username had to match exactly.
+        When several accounts match, an exact email wins, then an exact
+        username, then a case-insensitive email. The ranking happens in SQL,
+        so any number of case variants resolves to the right account.
+        """
+        if not identifier:
+            return None
+
+        def ranked(condition):
+            return Case(When(condition, then=Value(0)), default=Value(1))
+
+        return self.filter(
+            Q(email__iexact=identifier) | Q(username__iexact=identifier)
+        ).order_by(
+            ranked(Q(email=identifier)),
+            ranked(Q(username=identifier)),
+            ranked(Q(email__iexact=identifier)),
+            'pk',
+        ).first()
+
     def create_user(self, username, email, password, **extra_fields):
         if not username:
             raise ValueError("Username must be set")
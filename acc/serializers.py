@@ -1,13 +1,14 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
-from django.contrib.auth import get_user_model, authenticate
+from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes
-from django.core.mail import send_mail
 
 from django.conf import settings
 
+from .mail import queue_mail
+
 User = get_user_model()
 
 
@@ -20,21 +21,23 @@ class LoginSerializer(serializers.Serializer):
         email_or_username = data.get('email_or_username')
         password = data.get('password')
 
-        user = User.objects.filter(email=email_or_username).first(
-        ) or User.objects.filter(username=email_or_username).first()
-        if user and user.check_password(password):
-            if not user.is_active:
-                raise serializers.ValidationError('Please verify your email.')
-
-            user = authenticate(username=user.username, password=password)
-            if not user:
-                raise serializers.ValidationError(
-                    'Unable to log in with provided credentials.')
+        user = User.objects.find_by_email_or_username(email_or_username)
+        if user is None:
+            # Hash anyway so unknown identifiers cost the same as wrong
+            # passwords, as ModelBackend does.
+            User().set_password(password)
+            raise serializers.ValidationError('Invalid credentials.')
 
-            return {'user': user}
-        else:
+        # The only password hash of the request; authenticate() would
+        # re-query the user and hash it a second time.
+        if not user.check_password(password):
             raise serializers.ValidationError('Invalid credentials.')
 
+        if not user.is_active:
+            raise serializers.ValidationError('Please verify your email.')
+
+        return {'user': user}
+
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -63,12 +66,11 @@ class RegisterSerializer(serializers.ModelSerializer):
         uid = urlsafe_base64_encode(force_bytes(user.pk))
         verification_link = f"{settings.FRONTEND_URL}/verify-email/{uid}/{token}/"
 
-        send_mail(
+        queue_mail(
             'Verify Your Email',
             f'Click the link to verify your email: {verification_link}',
             settings.DEFAULT_FROM_EMAIL,
             [user.email],
-            fail_silently=False
         )
 
         return user
@@ -117,12 +119,11 @@ class PasswordResetSerializer(serializers.Serializer):
         uid = urlsafe_base64_encode(force_bytes(user.pk))
         reset_link = f"{settings.FRONTEND_URL}/reset-password/{uid}/{token}/"
 
-        send_mail(
+        queue_mail(
             'Password Reset Request',
             f'Click the link to reset your password: {reset_link}',
             settings.DEFAULT_FROM_EMAIL,
             [user.email],
-            fail_silently=False
         )
 
 
@@ -167,7 +168,7 @@ class SendEmailSerializer(serializers.Serializer):
         from_email = settings.DEFAULT_FROM_EMAIL
         to_email = [user.email]
 
-        send_mail(subject, message, from_email, to_email)
+        queue_mail(subject, message, from_email, to_email)
 
     def verification_link(self, user):
         uid = ...
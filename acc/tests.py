@@ -1,4 +1,199 @@
-from django.test import TestCase
+from unittest.mock import patch
 
-# Create your tests here.
-print(__name__)
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APITestCase
+
+from expense_tracker.testing import QueryBudgetMixin
+from acc.hashing import HashingUnavailable
+from acc.mail import queue_mail, send_queued
+from acc.models import OutboundEmail
+
+User = get_user_model()
+
+
+class QueryBudgetTests(QueryBudgetMixin, APITestCase):
+    budget_urlconf = 'acc.urls'
+    query_budgets = {
+        'home': 2,
+        'login': 0,
+        'logout': 4,
+        'registration': 0,
+        'change_password': 2,
+        'password_reset': 3,
+        'password_reset_done': 0,
+        'password_reset_confirm': 5,
+        'api_register': 5,
+        'api_login': 1,
+        'api_verify_email': 3,
+        'api_password_reset': 3,
+        'api_password_reset_confirm': 3,
+        'send-verification-email': 3,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user('budget', 'budget@example.com', 'old-password')
+        self.inactive = User.objects.create_user(
+            'inactive', 'inactive@example.com', 'password', is_active=False)
+        for i in range(5):
+            User.objects.create_user(f'user{i}', f'user{i}@example.com', 'password')
+
+    def tokens(self, user):
+        return {
+            'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+            'token': default_token_generator.make_token(user),
+        }
+
+    def budget_requests(self):
+        yield 'login', 'get', None, None
+        yield 'registration', 'get', None, None
+        yield 'password_reset', 'get', None, None
+        yield 'password_reset', 'post', None, {'email': self.user.email}, 'multipart'
+        self.assertEqual(OutboundEmail.objects.filter(to=[self.user.email]).count(), 1)
+        yield 'password_reset_done', 'get', None, None
+        tokens = self.tokens(self.user)
+        yield 'password_reset_confirm', 'get', {
+            'uidb64': tokens['uid'], 'token': tokens['token']}, None
+
+        yield 'api_register', 'post', None, {
+            'username': 'new', 'email': 'new@example.com',
+            'password': 'password', 'password2': 'password'}
+        self.assertFalse(User.objects.get(username='new').is_active)
+        response = yield 'api_login', 'post', None, {
+            'email_or_username': self.user.email, 'password': 'old-password'}
+        self.assertEqual(response.data['user_id'], self.user.pk)
+        yield 'send-verification-email', 'post', None, {'email': self.inactive.email}
+        self.assertEqual(OutboundEmail.objects.filter(to=[self.inactive.email]).count(), 1)
+        yield 'api_verify_email', 'post', None, self.tokens(self.inactive)
+        self.inactive.refresh_from_db()
+        self.assertTrue(self.inactive.is_active)
+        yield 'api_password_reset', 'post', None, {'email': self.user.email}
+        self.assertEqual(OutboundEmail.objects.filter(to=[self.user.email]).count(), 2)
+        yield 'api_password_reset_confirm', 'post', None, {
+            **self.tokens(self.user), 'new_password1': 'new-password',
+            'new_password2': 'new-password'}
+
+        # The password was just reset; a stale hash would void the session.
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('new-password'))
+        self.client.force_login(self.user)
+        yield 'home', 'get', None, None
+        yield 'change_password', 'get', None, None
+        yield 'logout', 'get', None, None
+
+class UnreachableBackend(BaseEmailBackend):
+    def open(self):
+        raise OSError("Connection refused")
+
+    def send_messages(self, messages):
+        raise AssertionError("unreachable")
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.email = queue_mail('Subject', 'Body', 'from@example.com', ['to@example.com'])
+
+    @override_settings(
+        EMAIL_BACKEND='acc.tests.UnreachableBackend', EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_unreachable_server_backs_off_then_fails(self):
+        self.assertEqual(send_queued(), (0, 1))
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.status, OutboundEmail.PENDING)
+        self.assertEqual(self.email.attempts, 1)
+        self.assertIn('Connection refused', self.email.last_error)
+        self.assertGreater(self.email.next_attempt_at, timezone.now())
+        # Not due again until the backoff has passed.
+        self.assertEqual(send_queued(), (0, 0))
+
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_queued(), (0, 1))
+        self.email.refresh_from_db()
+        self.assertEqual((self.email.status, self.email.attempts),
+                         (OutboundEmail.FAILED, 2))
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_retry_delivers(self):
+        OutboundEmail.objects.update(attempts=1, last_error='OSError()')
+        self.assertEqual(send_queued(), (1, 0))
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.status, OutboundEmail.SENT)
+        self.assertEqual(self.email.attempts, 2)
+        self.assertIsNone(self.email.last_error)
+        self.assertEqual(mail.outbox[0].to, ['to@example.com'])
+
+
+@patch.object(User, 'set_password', side_effect=HashingUnavailable())
+class HashingUnavailableTests(TestCase):
+    def test_registration(self, set_password):
+        response = self.client.post(reverse('registration'), {
+            'username': 'new', 'email': 'new@example.com',
+            'password': 'password', 'password2': 'password'})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn(HashingUnavailable.message, response.context['form'].non_field_errors())
+        self.assertFalse(User.objects.filter(username='new').exists())
+
+    def test_password_reset_confirm(self, set_password):
+        user = User.objects.create(username='reset', email='reset@example.com')
+        tokens = {'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+                  'token': default_token_generator.make_token(user)}
+        # The token is swapped for a session entry on the first visit.
+        url = self.client.get(reverse('password_reset_confirm', kwargs=tokens))['Location']
+        response = self.client.post(url, {'new_password1': 'password', 'new_password2': 'password'})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn(HashingUnavailable.message, response.context['form'].non_field_errors())
+
+    def test_api_login(self, set_password):
+        User.objects.create(username='api', email='api@example.com')
+        with patch.object(User, 'check_password', side_effect=HashingUnavailable()):
+            response = self.client.post(
+                reverse('api_login'), {'email_or_username': 'api', 'password': 'password'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'detail': HashingUnavailable.message})
+
+    def test_admin_login(self, set_password):
+        User.objects.create(username='staff', email='staff@example.com', is_staff=True)
+        with patch.object(User, 'check_password', side_effect=HashingUnavailable()):
+            response = self.client.post(
+                '/admin/login/', {'username': 'staff', 'password': 'password'})
+        self.assertEqual(response.status_code, 503)
+
+
+class IdentifierLookupTests(TestCase):
+    def setUp(self):
+        # More case variants than any fixed-size candidate window.
+        for name in ['ALICE', 'Alice', 'aLice', 'alIce', 'aliCe']:
+            User.objects.create_user(name, f'{name}@example.com', 'password')
+        self.username = User.objects.create_user('alice', 'other@example.com', 'password')
+        self.email = User.objects.create_user('mail', 'alice@example.com', 'password')
+
+    def test_exact_email_wins(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(User.objects.find_by_email_or_username('alice@example.com'), self.email)
+
+    def test_exact_username_beats_case_variants(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(User.objects.find_by_email_or_username('alice'), self.username)
+
+    def test_case_insensitive_match(self):
+        self.assertEqual(User.objects.find_by_email_or_username('MAIL'), self.email)
+        self.assertIsNone(User.objects.find_by_email_or_username('nobody'))
+
+    def test_login_hashes_once(self):
+        url = reverse('api_login')
+        with patch.object(User, 'check_password', autospec=True, return_value=True) as check, \
+                patch.object(User, 'set_password', autospec=True) as set_password:
+            self.client.post(url, {'email_or_username': 'alice', 'password': 'password'})
+            check.assert_called_once_with(self.username, 'password')
+            set_password.assert_not_called()
+
+            check.reset_mock()
+            self.client.post(url, {'email_or_username': 'nobody', 'password': 'password'})
+            check.assert_not_called()
+            set_password.assert_called_once()
@@ -0,0 +1,28 @@
+import hashlib
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class AuthIPRateThrottle(SimpleRateThrottle):
+    scope = 'auth_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class AuthIdentifierRateThrottle(SimpleRateThrottle):
+    """Limits attempts against one account, whichever IPs they come from."""
+    scope = 'auth_identifier'
+    identifier_fields = ['email_or_username', 'email', 'uid']
+
+    def get_cache_key(self, request, view):
+        data = request.data
+        if not hasattr(data, 'get'):
+            return None
+
+        for field in self.identifier_fields:
+            value = data.get(field)
+            if value and isinstance(value, str):
+                ident = hashlib.sha256(value.strip().lower().encode()).hexdigest()
+                return self.cache_format % {'scope': self.scope, 'ident': ident}
+        return None
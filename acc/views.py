@@ -1,10 +1,9 @@
 from .serializers import SendEmailSerializer
 from rest_framework import generics, status
 from rest_framework.views import APIView
-from django.contrib.auth.models import User
+from django.contrib.auth import get_user_model
 from django.utils.http import urlsafe_base64_decode
 from django.conf import settings
-from django.core.mail import send_mail
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
@@ -28,6 +27,9 @@ from .serializers import (
     PasswordResetSerializer,
     PasswordResetConfirmSerializer,
 )
+from .hashing import HashingUnavailable
+from .mail import queue_mail
+from .throttling import AuthIPRateThrottle, AuthIdentifierRateThrottle
 from .mixins import LogoutRequiredMixin
 from .forms import (
     LoginForm,
@@ -37,6 +39,8 @@ from .forms import (
     ResetPasswordConfirmForm,
 )
 
+User = get_user_model()
+
 
 @method_decorator(never_cache, name='dispatch')
 class Home(LoginRequiredMixin, generic.TemplateView):
@@ -58,11 +62,15 @@ class Login(LogoutRequiredMixin, generic.View):
     def post(self, *args, **kwargs):
         form = LoginForm(self.request.POST)
         if form.is_valid():
-            user = authenticate(
-                self.request,
-                username=form.cleaned_data.get('username'),
-                password=form.cleaned_data.get('password')
-            )
+            try:
+                user = authenticate(
+                    self.request,
+                    username=form.cleaned_data.get('username'),
+                    password=form.cleaned_data.get('password')
+                )
+            except HashingUnavailable as e:
+                messages.warning(self.request, e.message)
+                return redirect('login')
             if user:
                 login(self.request, user)
                 return redirect('home')
@@ -85,8 +93,14 @@ class Registration(LogoutRequiredMixin, generic.CreateView):
     success_url = reverse_lazy('login')
 
     def form_valid(self, form):
+        try:
+            response = super().form_valid(form)
+        except HashingUnavailable as e:
+            form.add_error(None, e.message)
+            return self.render_to_response(
+                self.get_context_data(form=form), status=status.HTTP_503_SERVICE_UNAVAILABLE)
         messages.success(self.request, "Registration Successful!")
-        return super().form_valid(form)
+        return response
 
 
 @method_decorator(never_cache, name='dispatch')
@@ -101,6 +115,13 @@ class ChangePassword(LoginRequiredMixin, generic.FormView):
         context['user'] = self.request.user
         return context
 
+    def post(self, request, *args, **kwargs):
+        try:
+            return super().post(request, *args, **kwargs)
+        except HashingUnavailable as e:
+            messages.warning(request, e.message)
+            return redirect('change_password')
+
     def form_valid(self, form):
         user = self.request.user
         user.set_password(form.cleaned_data.get('new_password1'))
@@ -120,35 +141,34 @@ class ResetPasswordConfirm(PasswordResetConfirmView):
     success_url = reverse_lazy('login')
 
     def form_valid(self, form):
+        try:
+            response = super().form_valid(form)
+        except HashingUnavailable as e:
+            form.add_error(None, e.message)
+            return self.render_to_response(
+                self.get_context_data(form=form), status=status.HTTP_503_SERVICE_UNAVAILABLE)
         messages.success(self.request, "Password reset successfully!")
-        return super().form_valid(form)
+        return response
 
 
 @method_decorator(csrf_exempt, name='dispatch')
 class RegisterUserAPIView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [AuthIPRateThrottle, AuthIdentifierRateThrottle]
 
     def perform_create(self, serializer):
-        user = serializer.save()
-        token = default_token_generator.make_token(user)
-        uid = urlsafe_base64_encode(force_bytes(user.pk))
-        verification_link = f"{settings.FRONTEND_URL}/verify-email/{uid}/{token}/"
-        send_mail(
-            'Verify Your Email',
-            f'Click the link to verify your email: {verification_link}',
-            settings.DEFAULT_FROM_EMAIL,
-            [user.email],
-            fail_silently=False,
-        )
+        # RegisterSerializer.create already queues the verification email.
+        serializer.save()
 
 
 class SendVerificationEmailAPIView(APIView):
+    throttle_classes = [AuthIPRateThrottle, AuthIdentifierRateThrottle]
+
     def post(self, request):
         email_or_username = request.data.get('email_or_username')
         try:
-            user = User.objects.filter(email=email_or_username).first() or \
-                User.objects.filter(username=email_or_username).first()
+            user = User.objects.find_by_email_or_username(email_or_username)
 
             if user is None:
                 return Response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
@@ -160,12 +180,11 @@ class SendVerificationEmailAPIView(APIView):
             uid = urlsafe_base64_encode(force_bytes(user.pk))
             verification_link = f"{settings.FRONTEND_URL}/verify-email/{uid}/{token}/"
 
-            send_mail(
+            queue_mail(
                 'Verify Your Email',
                 f'Click the link to verify your email: {verification_link}',
                 settings.DEFAULT_FROM_EMAIL,
                 [user.email],
-                fail_silently=False,
             )
 
             return Response({"message": "Verification email sent."}, status=status.HTTP_200_OK)
@@ -179,6 +198,7 @@ class SendVerificationEmailAPIView(APIView):
 class LoginAPIView(generics.GenericAPIView):
     serializer_class = LoginSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [AuthIPRateThrottle, AuthIdentifierRateThrottle]
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -201,6 +221,7 @@ class VerifyEmailAPIView(generics.GenericAPIView):
 class PasswordResetRequestAPIView(generics.GenericAPIView):
     serializer_class = PasswordResetSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [AuthIPRateThrottle, AuthIdentifierRateThrottle]
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -212,6 +233,7 @@ class PasswordResetRequestAPIView(generics.GenericAPIView):
 class PasswordResetConfirmAPIView(generics.GenericAPIView):
     serializer_class = PasswordResetConfirmSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [AuthIPRateThrottle, AuthIdentifierRateThrottle]
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -223,3 +245,4 @@ class PasswordResetConfirmAPIView(generics.GenericAPIView):
 class SendEmailAPIView(generics.CreateAPIView):
     serializer_class = SendEmailSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [AuthIPRateThrottle, AuthIdentifierRateThrottle]
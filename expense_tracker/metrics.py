@@ -0,0 +1,65 @@
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+# (metric name, help text) in the order RequestMetrics keeps the values.
+METRICS = [
+    ('http_requests_total', 'Requests served.'),
+    ('http_request_db_queries_total', 'SQL queries run while serving requests.'),
+    ('http_request_db_seconds_total', 'Time spent in SQL queries.'),
+    ('http_request_render_seconds_total', 'Time spent rendering responses.'),
+    ('http_request_duration_seconds_total', 'Total time spent serving requests.'),
+    ('http_response_bytes_total', 'Bytes of non-streaming response bodies.'),
+]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestMetrics:
+    """
+    Per-process counters of served requests, labelled by route, method and
+    status. Each worker process keeps its own; the scraper sums them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = defaultdict(lambda: [0] * len(METRICS))
+
+    def observe(self, route, method, status, queries, db_time, render_time, duration, size):
+        values = (1, queries, db_time, render_time, duration, size or 0)
+        with self._lock:
+            series = self._series[(route, method, status)]
+            for i, value in enumerate(values):
+                series[i] += value
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        """The counters in the Prometheus text exposition format."""
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+
+        lines = []
+        for i, (name, help_text) in enumerate(METRICS):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for (route, method, status), values in sorted(series.items()):
+                labels = f'route="{_escape(route)}",method="{method}",status="{status}"'
+                lines.append(f'{name}{{{labels}}} {values[i]:g}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = RequestMetrics()
+
+
+def metrics_view(request):
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1']):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
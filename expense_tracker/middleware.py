@@ -1,6 +1,145 @@
+import contextvars
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
 from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+from .metrics import registry
+from .routers import pin
+
+logger = logging.getLogger('expense_tracker.requests')
+
+# Timings of the request being served. Context variables follow the request
+# into sync_to_async worker threads, so their queries are counted too.
+current_timings = contextvars.ContextVar('current_timings', default=None)
 
 
 class DisableCSRFCheckForAPI(MiddlewareMixin):
     def process_request(self, request):
         setattr(request, '_dont_enforce_csrf_checks', True)
+
+
+class PinWritesMiddleware(MiddlewareMixin):
+    """
+    Pins a user to the primary database for EXPENSES_REPLICA_PIN_SECONDS
+    after a successful write request, so their next reads see it even if
+    the replicas lag behind (read-your-writes).
+    """
+    def process_response(self, request, response):
+        user = getattr(request, 'user', None)
+        if request.method not in SAFE_METHODS and response.status_code < 400 \
+                and user is not None and user.is_authenticated:
+            pin(user.pk)
+        return response
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        # One duration per query; list.append is safe across worker threads.
+        self.query_times = []
+        self.render_started = None
+        self.render_time = 0.0
+
+    def rendered(self, response):
+        self.render_time = time.perf_counter() - self.render_started
+
+
+def record_query(execute, sql, params, many, context):
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.query_times.append(time.perf_counter() - started)
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures each request: SQL query count and time, response rendering time,
+    total time and response size. They are reported in a ``Server-Timing``
+    header, one JSON log line on ``expense_tracker.requests``, and the
+    counters served by ``metrics_view``.
+
+    Streaming responses are measured up to the point the body starts
+    streaming; their size is not known.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(install_query_recorder, dispatch_uid='record_query')
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    def process_template_response(self, request, response):
+        # Outermost middleware, so this runs right before the render.
+        timings = current_timings.get()
+        if timings is not None:
+            timings.render_started = time.perf_counter()
+            response.add_post_render_callback(timings.rendered)
+        return response
+
+    def finish(self, request, response, timings):
+        duration = time.perf_counter() - timings.started
+        queries = len(timings.query_times)
+        db_time = sum(timings.query_times)
+        size = None if response.streaming else len(response.content)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db_time * 1000:.1f};desc="{queries} queries"',
+            f'render;dur={timings.render_time * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ])
+
+        match = request.resolver_match
+        route = match.view_name if match is not None else 'unmatched'
+        registry.observe(route, request.method, response.status_code,
+                         queries, db_time, timings.render_time, duration, size)
+        logger.info(json.dumps({
+            'route': route,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': queries,
+            'db_ms': round(db_time * 1000, 2),
+            'render_ms': round(timings.render_time * 1000, 2),
+            'total_ms': round(duration * 1000, 2),
+            'bytes': size,
+        }))
+        return response
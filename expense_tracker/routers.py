@@ -0,0 +1,107 @@
+import contextvars
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger('expense_tracker.requests')
+
+# Database the reads of the current request may go to; None means the
+# primary. Set per request by ReplicaReadMixin, so only the views that opt
+# in read from replicas and everything else (including writes and the reads
+# that feed them) stays on the primary.
+read_alias = contextvars.ContextVar('read_alias', default=None)
+
+# Replica alias -> monotonic time until which it is skipped after failing.
+_down_until = {}
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_key(user_id):
+    return f'db-pin:{user_id}'
+
+
+def pin(user_id):
+    """Keep ``user_id`` reading from the primary until replicas catch up."""
+    timeout = getattr(settings, 'EXPENSES_REPLICA_PIN_SECONDS', 5)
+    if replicas() and timeout:
+        cache.set(pin_key(user_id), True, timeout)
+
+
+def is_pinned(user_id):
+    return cache.get(pin_key(user_id)) is not None
+
+
+def choose_replica(user_id=None):
+    """
+    A reachable replica for ``user_id``'s reads, or None for the primary:
+    when none is configured or reachable, or the user wrote recently. A
+    replica that fails to connect is skipped for
+    EXPENSES_REPLICA_RETRY_SECONDS.
+    """
+    now = time.monotonic()
+    candidates = [alias for alias in replicas() if _down_until.get(alias, 0) <= now]
+    if not candidates or (user_id is not None and is_pinned(user_id)):
+        return None
+
+    alias = random.choice(candidates)
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError as exc:
+        _down_until[alias] = now + getattr(settings, 'EXPENSES_REPLICA_RETRY_SECONDS', 30)
+        logger.warning("Replica %s unavailable, reading from the primary: %s", alias, exc)
+        return None
+    return alias
+
+
+class ReplicaRouter:
+    """
+    Sends reads to the alias chosen for the current request (see
+    ``read_alias``) and everything else to the primary. Replicas hold the
+    same data, so relations across them are allowed; their schema comes
+    from replication, so nothing is migrated on them.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in replicas() else None
+
+
+class ReplicaReadMixin:
+    """
+    APIView mixin: safe-method requests read from a replica once the user
+    is authenticated, unless they are pinned to the primary by a recent
+    write (see ``PinWritesMiddleware``). Streaming views should bind their
+    querysets to ``read_alias.get()`` themselves, as the body is produced
+    after the view returns.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and replicas():
+            self._read_alias_token = read_alias.set(choose_replica(request.user.pk))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_read_alias_token', None)
+        if token is not None:
+            read_alias.reset(token)
+            self._read_alias_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -20,6 +20,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'allauth',
     'allauth.account',
     'allauth.socialaccount',
@@ -29,6 +30,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'expense_tracker.middleware.RequestMetricsMiddleware',
     'expense_tracker.middleware.DisableCSRFCheckForAPI',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -36,8 +38,10 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'acc.exceptions.HashingUnavailableMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
+    'expense_tracker.middleware.PinWritesMiddleware',
 ]
 
 ROOT_URLCONF = 'expense_tracker.urls'
@@ -64,24 +68,55 @@ AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
     'allauth.account.auth_backends.AuthenticationBackend',
 ]
+# Connections are kept open for "db_conn_max_age" seconds (0 closes them
+# after every request) and checked before being reused. "db_pool" (True,
+# or psycopg_pool.ConnectionPool arguments such as {"min_size": 2,
+# "max_size": 10}) uses a connection pool instead, which also pays off under
+# ASGI, where requests don't keep a thread of their own. Pooling needs
+# psycopg 3 and psycopg_pool rather than psycopg2 (pip install -r
+# requirements-pool.txt); without them Django raises ImproperlyConfigured.
+DB_POOL = yamette_kudasai.get('db_pool')
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # e.g. django.db.backends.sqlite3 with a file path as "name", to run
+        # seed_ledger / benchmark_suite against SQLite.
+        'ENGINE': yamette_kudasai.get(
+            'db_engine', 'django.db.backends.postgresql'),
         'NAME': yamette_kudasai.get("name"),
         'USER': yamette_kudasai.get("user"),
         'PASSWORD': yamette_kudasai.get("password"),
         'HOST': yamette_kudasai.get("host"),
         'PORT': yamette_kudasai.get("port"),
+        # Pooled connections go back to the pool after each request.
+        'CONN_MAX_AGE': 0 if DB_POOL else yamette_kudasai.get('db_conn_max_age', 60),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'pool': DB_POOL} if DB_POOL else {},
     }
 }
 
+# Read replicas: "db_replicas" is a list of connection settings laid over
+# the default ones, e.g. [{"HOST": "replica-1"}] (or another SQLite file to
+# try it locally). Overview, summary, report and export reads go to them;
+# see expense_tracker.routers.
+DATABASE_REPLICAS = []
+for number, replica in enumerate(yamette_kudasai.get('db_replicas', []), start=1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'], **replica, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['expense_tracker.routers.ReplicaRouter']
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    'EXCEPTION_HANDLER': 'acc.exceptions.exception_handler',
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': '30/min',
+        'auth_identifier': '10/min',
+    },
 }
 
 SIMPLE_JWT = {
@@ -90,6 +125,23 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
 }
+PASSWORD_HASHERS = [
+    'acc.hashing.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+# Processes hashing passwords off the request thread, and how many hashes a
+# web process may have in flight before refusing logins with a 503. The
+# default of 0 hashes inline on the request thread: with one request per
+# process (gunicorn sync workers) a pool would only add IPC. Threaded or ASGI
+# deployments should set password_hashing_workers to about the CPU count so
+# PBKDF2 stops holding the GIL that the other requests need.
+PASSWORD_HASHING_WORKERS = yamette_kudasai.get('password_hashing_workers', 0)
+PASSWORD_HASHING_QUEUE_SIZE = 32
+PASSWORD_HASHING_QUEUE_TIMEOUT = 2  # seconds
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -114,6 +166,14 @@ USE_I18N = True
 
 USE_TZ = True
 
+CACHES = {
+    'default': {
+        'BACKEND': yamette_kudasai.get(
+            'cache_backend', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': yamette_kudasai.get('cache_location', 'expense-tracker'),
+    }
+}
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
@@ -122,6 +182,9 @@ EMAIL_HOST_USER = yamette_kudasai.get('email')
 EMAIL_HOST_PASSWORD = yamette_kudasai.get('app_pass')
 FRONTEND_URL = 'http://127.0.0.1:8000'
 DEFAULT_FROM_EMAIL = yamette_kudasai.get('email')
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_BACKOFF = 60  # seconds, doubled on every failed attempt
+EMAIL_OUTBOX_LEASE = 600  # seconds a worker may take to send the messages it claimed
 
 STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
@@ -129,3 +192,50 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 STATICFILES_DIRS = ['static/']
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# The ledger's covering indexes (Index(include=...)) only exist on
+# PostgreSQL; SQLite builds them without the included columns, which is
+# harmless for development and tests.
+SILENCED_SYSTEM_CHECKS = ['models.W040']
+
+# Clients allowed to scrape /metrics/.
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # One JSON line per request from RequestMetricsMiddleware.
+        'expense_tracker.requests': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+TEST_RUNNER = 'expense_tracker.testing.TestRunner'
+
+EXPENSES_PAGE_SIZE = 100
+EXPENSES_MAX_PAGE_SIZE = 1000
+EXPENSES_MAX_BATCH_SIZE = 1000
+EXPENSES_FAST_SERIALIZATION = False
+# Serve the read-only expenses endpoints with async views (run under ASGI).
+EXPENSES_ASYNC_VIEWS = False
+OVERVIEW_CACHE_TIMEOUT = 300
+# Exchange rates are quoted in, and reports totalled in, this currency.
+EXPENSES_BASE_CURRENCY = 'USD'
+# Seconds a worker reuses a rate it looked up before reading it again.
+EXPENSES_RATE_CACHE_SECONDS = 300
+# Delta sync: seconds re-read before each token, and how long deletions are
+# remembered (older tokens get a full resync).
+EXPENSES_SYNC_OVERLAP = 5
+EXPENSES_SYNC_TOMBSTONE_DAYS = 90
+# Reads stay on the primary this long after a user's write; a replica that
+# fails to connect is skipped this long.
+EXPENSES_REPLICA_PIN_SECONDS = 5
+EXPENSES_REPLICA_RETRY_SECONDS = 30
+# archive_ledger moves expenses and incomes older than this to the archive.
+EXPENSES_ARCHIVE_YEARS = 3
@@ -0,0 +1,93 @@
+import logging
+from contextlib import contextmanager
+from importlib import import_module
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, reverse
+
+
+class TestRunner(DiscoverRunner):
+    """Keeps the per-request log lines out of the test output."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        logging.getLogger('expense_tracker.requests').setLevel(logging.WARNING)
+
+
+def url_names(urlpatterns):
+    """Every URL name declared in ``urlpatterns``, including included ones."""
+    names = set()
+    for pattern in urlpatterns:
+        if isinstance(pattern, URLResolver):
+            names |= url_names(pattern.url_patterns)
+        elif pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin holding every URL of ``budget_urlconf`` to a maximum
+    number of SQL queries.
+
+    Subclasses fill ``query_budgets`` (URL name -> max queries) and
+    ``budget_requests()``; ``test_query_budgets`` then fails on any request
+    over its budget and on any named URL it did not exercise, so a new
+    endpoint cannot ship without a budget. Seed several rows per model in
+    ``setUp`` so an N+1 query pattern shows up as a blown budget, and check
+    the payloads too: a request can stay in budget by returning too little.
+    """
+    budget_urlconf = None
+    query_budgets = {}
+
+    def budget_requests(self):
+        """
+        Yield ``(url name, method, reverse() kwargs, data)`` per request,
+        optionally followed by the request format (default ``'json'``). Each
+        response is sent back, as the value of the ``yield``.
+        """
+        raise NotImplementedError
+
+    @contextmanager
+    def assertMaxQueries(self, budget, label='Block', using=DEFAULT_DB_ALIAS):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        if len(context) > budget:
+            queries = '\n'.join(
+                f"{number}. {query['sql']}"
+                for number, query in enumerate(context.captured_queries, start=1))
+            self.fail(f"{label} ran {len(context)} queries, budget is {budget}:\n{queries}")
+
+    def request_within_budget(self, name, method='get', kwargs=None, data=None, format='json'):
+        url = reverse(name, kwargs=kwargs)
+        with self.assertMaxQueries(self.query_budgets[name], f"{method.upper()} {url}"):
+            response = getattr(self.client, method)(url, data, format=format)
+            if response.streaming:
+                # The queries of a streamed body run while it is consumed;
+                # keep what it produced for the caller to check.
+                response.streaming_content = [b''.join(response.streaming_content)]
+        self.assertLess(response.status_code, 400,
+                        f"{method.upper()} {url} failed: {response.status_code}")
+        return response
+
+    def test_query_budgets(self):
+        exercised = set()
+        requests = self.budget_requests()
+        response = None
+        while True:
+            try:
+                name, method, kwargs, data, *format = requests.send(response)
+            except StopIteration:
+                break
+            response = None
+            with self.subTest(url=name, method=method):
+                response = self.request_within_budget(name, method, kwargs, data, *format)
+            exercised.add(name)
+
+        declared = url_names(import_module(self.budget_urlconf).urlpatterns)
+        self.assertFalse(sorted(declared - set(self.query_budgets)),
+                         "URLs without a query budget")
+        self.assertFalse(sorted(declared - exercised),
+                         "URLs with a query budget that no request exercises")
@@ -0,0 +1,50 @@
+from django.db import transaction
+from django.utils import timezone
+
+from . import sync
+from .models import ARCHIVED_MODELS
+
+
+def cutoff(years, today=None):
+    """The first day that stays hot when archiving rows older than ``years``."""
+    today = today or timezone.localdate()
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:  # 29 February
+        return today.replace(year=today.year - years, day=28)
+
+
+def archive_rows(model, before, batch_size=5000):
+    """
+    Move ``model`` rows dated before ``before`` into its archive table,
+    ``batch_size`` rows per transaction; returns how many were moved.
+
+    The delete is raw: the rows live on in the archive, so rollups and
+    cached reports must not react to it. Sync clients do get tombstones, as
+    archived rows are no longer synced.
+    """
+    archive_model = ARCHIVED_MODELS[model]
+    fields = [field.attname for field in archive_model._meta.concrete_fields]
+    moved = 0
+    while True:
+        with transaction.atomic():
+            owners = dict(model.objects.filter(date__lt=before).order_by('id')
+                          .values_list('id', 'user_id')[:batch_size])
+            if not owners:
+                return moved
+            ids = list(owners)
+            rows = model.objects.filter(id__in=ids).values_list(*fields)
+            archive_model.objects.bulk_create(
+                [archive_model(**dict(zip(fields, row))) for row in rows])
+            batch = model.objects.filter(id__in=ids)
+            batch._raw_delete(batch.db)
+            sync.bury(model(id=pk, user_id=user_id) for pk, user_id in owners.items())
+        moved += len(ids)
+
+
+def archive(before, batch_size=5000):
+    """Archive every archivable model; returns the rows moved per table."""
+    return {
+        model._meta.db_table: archive_rows(model, before, batch_size)
+        for model in ARCHIVED_MODELS
+    }
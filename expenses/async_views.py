@@ -0,0 +1,169 @@
+import asyncio
+import functools
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, MethodNotAllowed, NotAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from expense_tracker.routers import choose_replica, read_alias, replicas
+from .caching import etag_matches, get_ledger_version, overview_cache_key, overview_cache_timeout
+from .exports import FORMATS as EXPORT_FORMATS, astream_export
+from .reports import budget_status
+from .serializers import BudgetStatusSerializer
+from .views import (
+    BudgetStatusView,
+    FinancialOverviewView,
+    FinancialSummaryView,
+    LedgerExportView,
+    get_sections,
+)
+
+
+def render(data, status_code=status.HTTP_200_OK, headers=None):
+    return HttpResponse(JSONRenderer().render(data), status=status_code,
+                        content_type='application/json', headers=headers)
+
+
+async def authenticate(request):
+    """JWTAuthentication.authenticate() with the user lookup awaited."""
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    if header is None:
+        return None
+
+    raw_token = auth.get_raw_token(header)
+    if raw_token is None:
+        return None
+    token = auth.get_validated_token(raw_token)
+    try:
+        user = await auth.user_model.objects.aget(
+            **{jwt_settings.USER_ID_FIELD: token[jwt_settings.USER_ID_CLAIM]})
+    except (KeyError, auth.user_model.DoesNotExist):
+        raise AuthenticationFailed('User not found', code='user_not_found')
+    if not user.is_active:
+        raise AuthenticationFailed('User is inactive', code='user_inactive')
+    return user
+
+
+def async_api_view(view_class):
+    """
+    Decorator making an async function the GET-only counterpart of
+    ``view_class``: it gets a DRF ``Request`` once the JWT is authenticated
+    and ``view_class``'s permission and throttle classes have passed, and
+    API errors render like DRF's handler.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                if request.method != 'GET':
+                    raise MethodNotAllowed(request.method)
+                user = await authenticate(request)
+                if user is None:
+                    raise NotAuthenticated()
+                drf_request = Request(request)
+                drf_request.user = user
+                # Same order as APIView.initial(); throttles may hit the cache.
+                api_view = view_class(request=drf_request, args=args, kwargs=kwargs)
+                await sync_to_async(api_view.check_permissions)(drf_request)
+                await sync_to_async(api_view.check_throttles)(drf_request)
+                # Every async view is a read; see ReplicaReadMixin.
+                token = read_alias.set(
+                    await sync_to_async(choose_replica)(user.pk)) if replicas() else None
+                try:
+                    return await view(drf_request, *args, **kwargs)
+                finally:
+                    if token is not None:
+                        read_alias.reset(token)
+            except APIException as exc:
+                headers = {}
+                if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                    exc.status_code = status.HTTP_401_UNAUTHORIZED
+                    headers['WWW-Authenticate'] = JWTAuthentication().authenticate_header(request)
+                if getattr(exc, 'wait', None):
+                    headers['Retry-After'] = '%d' % exc.wait
+                data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+                return render(data, exc.status_code, headers)
+        return wrapper
+    return decorator
+
+
+def in_worker_thread(func):
+    """
+    Run ``func`` on its own thread and database connection. Django's async
+    ORM funnels every query through one shared thread, so ``gather`` over it
+    would still run the queries one after another.
+    """
+    def run(*args):
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+@async_api_view(FinancialOverviewView)
+async def financial_overview(request):
+    view = FinancialOverviewView()
+    version = await sync_to_async(get_ledger_version)(request.user.pk)
+    cache_key, etag = overview_cache_key(request, version)
+    if etag_matches(request, etag):
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    response_data = await cache.aget(cache_key)
+    if response_data is None:
+        names = get_sections(request, view.sections)
+        sections = await asyncio.gather(
+            *(in_worker_thread(view.get_section)(request, name) for name in names))
+
+        response_data = {"username": request.user.username}
+        response_data.update(
+            (name, data) for name, (data, _) in zip(names, sections))
+        response_data["next"] = {
+            name: next_cursor for name, (_, next_cursor) in zip(names, sections)}
+        await cache.aset(cache_key, response_data, overview_cache_timeout())
+
+    return render(response_data, headers={'ETag': etag})
+
+
+@async_api_view(FinancialSummaryView)
+async def financial_summary(request):
+    view = FinancialSummaryView()
+    query = view.get_query(request)
+    names = get_sections(request, view.get_available(query['group_by']))
+
+    sections = await asyncio.gather(
+        *(in_worker_thread(view.get_section)(request, name, query) for name in names))
+
+    return render({"group_by": query['group_by'], **dict(zip(names, sections))})
+
+
+@async_api_view(BudgetStatusView)
+async def budget_status_view(request):
+    on = BudgetStatusView().get_on(request)
+
+    budgets = [budget async for budget in budget_status(request.user, on)]
+
+    return render({
+        "on": on,
+        "budgets": BudgetStatusSerializer(budgets, many=True).data,
+    })
+
+
+@async_api_view(LedgerExportView)
+async def ledger_export(request):
+    section, fmt = LedgerExportView().get_export(request)
+
+    response = StreamingHttpResponse(
+        astream_export(request.user, section, fmt, read_alias.get()),
+        content_type=EXPORT_FORMATS[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{section}.{fmt}"'
+    return response
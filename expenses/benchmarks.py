@@ -0,0 +1,168 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from acc.views import LoginAPIView
+from .views import (
+    BudgetStatusView,
+    ExpenseImportView,
+    FinancialOverviewView,
+    FinancialSummaryView,
+    LedgerExportView,
+    LedgerSyncView,
+)
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is always rolled back."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def measure(func, repeat, warmup=1):
+    """Wall-clock timings of ``func()`` over ``repeat`` runs, in milliseconds."""
+    for _ in range(warmup):
+        func()
+    with CaptureQueriesContext(connection) as queries:
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    return {
+        'runs': repeat,
+        'queries': len(queries),
+        'min_ms': round(timings[0], 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[max(int(len(timings) * 0.95) - 1, 0)], 3),
+        'max_ms': round(timings[-1], 3),
+    }
+
+
+class LedgerBenchmarks:
+    """
+    Times the API paths that matter for performance against whatever data
+    is in the database (see ``seed_ledger``). Views are called in-process
+    through ``APIRequestFactory``, so the numbers cover the view, ORM and
+    serialization but not the HTTP server.
+    """
+
+    def __init__(self, user, import_rows=1000):
+        self.user = user
+        self.import_rows = import_rows
+        self.factory = APIRequestFactory()
+
+    def call(self, view, method='get', data=None, **kwargs):
+        request = getattr(self.factory, method)('/', data, **kwargs)
+        force_authenticate(request, user=self.user)
+        response = view(request)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        else:
+            response.render()
+        assert response.status_code < 400, (response.status_code, response.content[:500])
+        return response
+
+    def get(self, view, data=None):
+        return lambda: self.call(view, data=data)
+
+    def uncached(self, func):
+        def run():
+            cache.clear()
+            func()
+        return run
+
+    def import_file(self):
+        lines = [f'{i % 500}.{i % 100:02d},2024-{i % 12 + 1:02d}-{i % 28 + 1:02d},Imported {i % 7}\n'
+                 for i in range(self.import_rows)]
+        return ('amount,date,category\n' + ''.join(lines)).encode()
+
+    def run_import(self):
+        upload = SimpleUploadedFile('expenses.csv', self.import_file())
+        with rolled_back():
+            self.call(ExpenseImportView.as_view(), 'post', {'file': upload}, format='multipart')
+
+    def reconnecting(self, func):
+        # What every request pays without persistent or pooled connections.
+        def run():
+            connection.close()
+            func()
+        return run
+
+    def login(self, identifier, expected_status):
+        # Throttling would turn most runs into 429s; it is not what is timed.
+        login = LoginAPIView.as_view(throttle_classes=[])
+
+        def run():
+            response = login(self.factory.post('/', {
+                'email_or_username': identifier, 'password': 'benchmark-password'}))
+            response.render()
+            assert response.status_code == expected_status, response.status_code
+        return run
+
+    def benchmarks(self):
+        overview = FinancialOverviewView.as_view()
+        summary = FinancialSummaryView.as_view()
+        export = LedgerExportView.as_view()
+
+        def overview_fast():
+            with override_settings(EXPENSES_FAST_SERIALIZATION=True):
+                self.call(overview)
+
+        return {
+            'overview': self.uncached(self.get(overview)),
+            'overview_cached': self.get(overview),
+            'overview_fast_serialization': self.uncached(overview_fast),
+            'summary_month': self.get(summary, {'group_by': 'month'}),
+            'summary_day': self.get(summary, {'group_by': 'day'}),
+            'summary_category': self.get(summary, {'group_by': 'category'}),
+            'budget_status': self.get(BudgetStatusView.as_view()),
+            'sync_full': self.get(LedgerSyncView.as_view()),
+            'export_csv': self.get(export, {'file_format': 'csv'}),
+            'export_ndjson': self.get(export, {'file_format': 'ndjson'}),
+            'import_csv': self.run_import,
+            'auth_login': self.login('benchmark-login@example.com', 200),
+            'auth_login_unknown_user': self.login('nobody@example.com', 400),
+        }
+
+    def connection_benchmarks(self):
+        summary = self.get(FinancialSummaryView.as_view(), {'group_by': 'month'})
+        return {
+            'connection_setup': self.reconnecting(connection.ensure_connection),
+            'summary_month_new_connection': self.reconnecting(summary),
+        }
+
+    def all_benchmarks(self):
+        return {**self.connection_benchmarks(), **self.benchmarks()}
+
+    def run(self, repeat, only=None):
+        results = {}
+        # Reconnecting can't happen inside a transaction; these only read.
+        for name, func in self.connection_benchmarks().items():
+            if not only or name in only:
+                results[name] = measure(func, repeat)
+
+        # Everything else runs in one transaction that is rolled back, so
+        # the suite leaves the database as it found it.
+        with rolled_back():
+            get_user_model().objects.create_user(
+                'benchmark-login', 'benchmark-login@example.com', 'benchmark-password')
+            for name, func in self.benchmarks().items():
+                if not only or name in only:
+                    results[name] = measure(func, repeat)
+        return results
@@ -0,0 +1,53 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def ledger_version_key(user_id):
+    return f'ledger-version:{user_id}'
+
+
+def get_ledger_version(user_id):
+    version = cache.get(ledger_version_key(user_id))
+    if version is None:
+        version = bump_ledger_version(user_id)
+    return version
+
+
+def bump_ledger_version(*user_ids):
+    """
+    Invalidate everything cached for these users' ledgers. A fresh random
+    token (rather than an increment) can't collide with a version that was
+    evicted and later recreated.
+    """
+    version = uuid.uuid4().hex
+    cache.set_many({ledger_version_key(user_id): version for user_id in user_ids}, timeout=None)
+    return version
+
+
+def bump_ledger_version_on_commit(*user_ids):
+    """
+    ``bump_ledger_version`` once the current transaction commits (right away
+    outside one). Bumping before the rows are visible would let a concurrent
+    request cache the old payload under the new version.
+    """
+    transaction.on_commit(lambda: bump_ledger_version(*user_ids))
+
+
+def overview_cache_key(request, version):
+    query = '&'.join(f'{key}={value}' for key, value in sorted(request.query_params.items()))
+    digest = hashlib.sha1(
+        f'{version}:{request.user.get_username()}?{query}'.encode()).hexdigest()
+    return f'overview:{request.user.pk}:{digest}', f'"{digest}"'
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match', '')
+    return etag in [tag.strip() for tag in header.split(',')] or header.strip() == '*'
+
+
+def overview_cache_timeout():
+    return getattr(settings, 'OVERVIEW_CACHE_TIMEOUT', 300)
@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, F, Value
+from django.db.models.functions import Coalesce, Round
+
+from .models import ExchangeRate, base_currency
+
+CENT = Decimal('0.01')
+ONE = Decimal('1')
+RATE_CACHE_SIZE = 4096
+
+
+def in_base(amount='amount', rate='rate'):
+    """
+    ``amount`` converted to the base currency in SQL, through the
+    (currency, date) join of the ``rate`` relation. Rows with no rate loaded
+    for their currency and day (base currency rows among them) count at face
+    value; each row is rounded to cents like ``to_base``.
+    """
+    return Round(
+        F(amount) * Coalesce(F(f'{rate}__rate'), Value(ONE)), 2,
+        output_field=DecimalField(max_digits=20, decimal_places=2))
+
+
+class RateCache:
+    """
+    In-process LRU of ``(currency, date) -> rate``, so converting a batch of
+    rows in Python costs at most one query for the pairs not seen yet.
+
+    Pairs with no rate are not cached, so rates loaded by another process
+    are picked up on the next lookup; loaded ones expire after
+    ``EXPENSES_RATE_CACHE_SECONDS`` in case they are corrected.
+    """
+
+    def __init__(self, maxsize=RATE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_many(self, keys):
+        found, missing = {}, set()
+        now = time.monotonic()
+        with self.lock:
+            for key in set(keys):
+                entry = self.entries.get(key)
+                if entry is not None and entry[1] > now:
+                    self.entries.move_to_end(key)
+                    found[key] = entry[0]
+                else:
+                    missing.add(key)
+        if not missing:
+            return found
+
+        # Currencies x days covers every missing pair in one indexed lookup.
+        loaded = {
+            (currency, day): rate for currency, day, rate in ExchangeRate.objects.filter(
+                currency__in={currency for currency, _ in missing},
+                date__in={day for _, day in missing},
+            ).values_list('currency', 'date', 'rate')
+        }
+        expires = now + getattr(settings, 'EXPENSES_RATE_CACHE_SECONDS', 300)
+        with self.lock:
+            for key in missing:
+                found[key] = rate = loaded.get(key)
+                if rate is None:
+                    self.entries.pop(key, None)
+                else:
+                    self.entries[key] = rate, expires
+                    self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return found
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+rates = RateCache()
+
+
+def to_base(items):
+    """
+    Base-currency amounts of ``(amount, currency, date)`` triples, rounded
+    to cents; the Python counterpart of ``in_base``.
+    """
+    items = list(items)
+    base = base_currency()
+    found = rates.get_many((currency, day) for _, currency, day in items if currency != base)
+    converted = []
+    for amount, currency, day in items:
+        amount = Decimal(str(amount))
+        rate = found.get((currency, day)) if currency != base else None
+        converted.append(amount if rate is None else (amount * rate).quantize(CENT, ROUND_HALF_UP))
+    return converted
+
+
+def fill_gaps(quotes, through=None):
+    """
+    ``{date: rate}`` of one currency with every missing day up to the last
+    quote (or ``through``) carrying the previous rate, so weekends and
+    holidays still join on (currency, date).
+    """
+    day, end = min(quotes), max(quotes)
+    if through and through > end:
+        end = through
+    filled, rate = {}, None
+    while day <= end:
+        filled[day] = rate = quotes.get(day, rate)
+        day += timedelta(days=1)
+    return filled
+
+
+def load_rates(quotes, through=None, batch_size=1000):
+    """
+    Upsert ``(currency, date, rate)`` quotes, gap-filled per currency, and
+    return how many rows were written. Only this process's rate cache is
+    cleared; other workers see new days right away and corrected ones once
+    their cached rates expire.
+    """
+    by_currency = defaultdict(dict)
+    for currency, day, rate in quotes:
+        by_currency[currency][day] = rate
+
+    rows = [
+        ExchangeRate(currency=currency, date=day, rate=rate)
+        for currency, currency_quotes in by_currency.items()
+        for day, rate in fill_gaps(currency_quotes, through).items()
+    ]
+    with transaction.atomic():
+        ExchangeRate.objects.bulk_create(
+            rows, batch_size=batch_size, update_conflicts=True,
+            unique_fields=['currency', 'date'], update_fields=['rate'])
+    rates.clear()
+    return len(rows)
@@ -0,0 +1,169 @@
+import codecs
+import csv
+import json
+
+from django.db import transaction
+from rest_framework import serializers
+
+from . import rollups
+from .caching import bump_ledger_version_on_commit
+from .models import Expense, ExpenseCategory
+from .serializers import ExpenseImportSerializer
+
+
+FORMATS = ['csv', 'jsonl']
+MAX_REPORTED_ERRORS = 100
+CATEGORY_NAME_LENGTH = ExpenseCategory._meta.get_field('name').max_length
+
+
+def guess_format(filename):
+    if filename and filename.lower().endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    return 'csv'
+
+
+class UnreadableFile(Exception):
+    """The file stopped decoding as UTF-8 text or parsing as CSV at ``row``."""
+
+    def __init__(self, row, detail):
+        super().__init__(f"row {row}: {detail}")
+        self.row = row
+        self.detail = detail
+
+
+def decode_lines(fileobj):
+    # Line by line rather than through a TextIOWrapper, so a decoding error
+    # surfaces at its own row instead of at the start of a buffered block.
+    for number, line in enumerate(fileobj):
+        if number == 0 and line.startswith(codecs.BOM_UTF8):
+            line = line[len(codecs.BOM_UTF8):]
+        yield line.decode('utf-8')
+
+
+def read_records(fileobj, fmt):
+    text = decode_lines(fileobj)
+    if fmt == 'csv':
+        yield from csv.DictReader(text)
+        return
+
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else {'_invalid': line}
+
+
+def iter_rows(fileobj, fmt):
+    """
+    Lazily yield one dict per CSV record or JSON line of a binary file.
+    Raises ``UnreadableFile`` at the first record that is not UTF-8 or not
+    valid CSV.
+    """
+    number = 0
+    try:
+        for number, row in enumerate(read_records(fileobj, fmt), start=1):
+            yield row
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise UnreadableFile(number + 1, str(exc))
+
+
+def resolve_categories(user, names):
+    """Map category names to ids with one lookup, creating the missing ones."""
+    found = dict(ExpenseCategory.objects.filter(
+        user=user, name__in=names).values_list('name', 'id'))
+    missing = [name for name in names if name not in found]
+    if missing:
+        created = ExpenseCategory.objects.bulk_create(
+            [ExpenseCategory(user=user, name=name) for name in missing])
+        if all(category.pk for category in created):
+            found.update((category.name, category.pk) for category in created)
+        else:
+            found.update(ExpenseCategory.objects.filter(
+                user=user, name__in=missing).values_list('name', 'id'))
+    return found
+
+
+def category_name(row):
+    """The row's category name, or None when it has none (or only whitespace)."""
+    category = row.get('category')
+    if category is None:
+        return None
+    return str(category).strip() or None
+
+
+def import_chunk(user, chunk, first_row, validator, errors):
+    valid = []
+    for number, row in enumerate(chunk, start=first_row):
+        try:
+            if '_invalid' in row:
+                raise serializers.ValidationError("Row is not a JSON object.")
+            data = validator.run_validation(row)
+            name = category_name(row)
+            if name and len(name) > CATEGORY_NAME_LENGTH:
+                raise serializers.ValidationError({'category': [
+                    f"Ensure this field has no more than {CATEGORY_NAME_LENGTH} characters."]})
+        except serializers.ValidationError as exc:
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"row": number, "errors": exc.detail})
+            continue
+        valid.append((data, name))
+
+    # Only rows that are imported get their categories created.
+    names = {name for _, name in valid if name}
+    with transaction.atomic():
+        categories = resolve_categories(user, names) if names else {}
+        expenses = [
+            Expense(user=user, category_id=categories.get(name), **data)
+            for data, name in valid
+        ]
+        Expense.objects.bulk_create(expenses, batch_size=1000)
+        rollups.record(expenses)
+    return len(expenses)
+
+
+def read_chunk(rows, chunk_size):
+    """Up to ``chunk_size`` rows, and the ``UnreadableFile`` that cut it short."""
+    chunk = []
+    try:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                break
+    except UnreadableFile as exc:
+        return chunk, exc
+    return chunk, None
+
+
+def import_expenses(user, rows, chunk_size=2000):
+    """
+    Validate and insert expense rows in chunks of ``chunk_size``.
+
+    Invalid rows are skipped and reported (the first ``MAX_REPORTED_ERRORS``
+    of them) with their 1-based row number. A file that cannot be read to
+    the end stops the import at the unreadable row, which is reported too;
+    ``complete`` is then false and the chunks before it stay imported.
+    """
+    validator = ExpenseImportSerializer()
+    rows = iter(rows)
+    created = total = 0
+    errors = []
+    unreadable = None
+    while unreadable is None:
+        chunk, unreadable = read_chunk(rows, chunk_size)
+        if not chunk:
+            break
+        created += import_chunk(user, chunk, total + 1, validator, errors)
+        total += len(chunk)
+
+    if unreadable is not None:
+        errors.append({"row": unreadable.row, "errors": [f"File is not readable: {unreadable.detail}"]})
+    if created:
+        bump_ledger_version_on_commit(user.pk)
+    return {
+        "rows": total, "created": created, "failed": total - created, "errors": errors,
+        "complete": unreadable is None,
+    }
@@ -0,0 +1,37 @@
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.archive import archive, cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        "Move expenses and incomes older than --years (EXPENSES_ARCHIVE_YEARS) into "
+        "the archive tables. Archived rows stay in the overview, exports and monthly "
+        "rollups, but are no longer editable, synced or searchable through the API; "
+        "sync clients receive tombstones for them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int,
+                            default=getattr(settings, 'EXPENSES_ARCHIVE_YEARS', 3))
+        parser.add_argument('--before', type=date.fromisoformat,
+                            help="Archive rows dated before this day instead of --years.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['years'] < 1 and not options['before']:
+            raise CommandError("--years must be at least 1.")
+        before = options['before'] or cutoff(options['years'])
+
+        started = time.perf_counter()
+        moved = archive(before, options['batch_size'])
+        elapsed = time.perf_counter() - started
+
+        for table, count in moved.items():
+            self.stdout.write(f"{table}: {count} rows")
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {sum(moved.values())} rows dated before {before} in {elapsed:.2f}s."))
@@ -0,0 +1,74 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Sum
+
+from expenses.models import User, Expense, Income, Budget
+
+
+class Command(BaseCommand):
+    help = "Time the per-user ledger queries that the (user, date) indexes serve."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Username to benchmark (defaults to the user with most expenses).")
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--days', type=int, default=30,
+                            help="Width of the date range queried.")
+        parser.add_argument('--explain', action='store_true',
+                            help="Print the query plan of each benchmark.")
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"User {username!r} does not exist.")
+
+        user = User.objects.annotate(n=Count('expense')).order_by('-n').first()
+        if user is None:
+            raise CommandError("No users to benchmark against.")
+        return user
+
+    def get_queries(self, user, days):
+        latest = Expense.objects.filter(user=user).order_by('-date').values_list('date', flat=True).first()
+        if latest is None:
+            raise CommandError(f"{user} has no expenses.")
+        start = latest - timedelta(days=days)
+        category_id = Expense.objects.filter(user=user, category__isnull=False).values_list(
+            'category', flat=True).first()
+
+        return {
+            'expense_range': Expense.objects.filter(
+                user=user, date__range=(start, latest)).order_by('-date', '-id'),
+            'expense_range_sum': Expense.objects.filter(
+                user=user, date__range=(start, latest)).values('user').annotate(total=Sum('amount')),
+            'expense_category_range': Expense.objects.filter(
+                user=user, category=category_id, date__range=(start, latest)),
+            'income_range': Income.objects.filter(
+                user=user, date__range=(start, latest)).order_by('-date', '-id'),
+            'active_budgets': Budget.objects.filter(
+                user=user, start_date__lte=latest, end_date__gte=latest),
+        }
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        queries = self.get_queries(user, options['days'])
+
+        self.stdout.write(f"{connection.vendor}, user={user.username}, repeat={options['repeat']}")
+        for name, queryset in queries.items():
+            if options['explain']:
+                self.stdout.write(queryset.explain())
+
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                rows = len(list(queryset.all()))
+                timings.append((time.perf_counter() - started) * 1000)
+
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) > 1 else timings[0]
+            self.stdout.write(
+                f"{name:<24} rows={rows:<6} median={statistics.median(timings):.3f}ms p95={p95:.3f}ms")
@@ -0,0 +1,67 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from expenses.models import Expense, Income, Savings, Budget
+from expenses.serializers import (
+    ExpenseSerializer,
+    IncomeSerializer,
+    SavingsSerializer,
+    BudgetSerializer,
+    FastSerializer,
+)
+
+
+def synthetic(model, i):
+    day = date(2020, 1, 1) + timedelta(days=i % 1500)
+    amount = Decimal(i % 100000) / 100
+    if model is Budget:
+        return Budget(id=i, limit=amount, start_date=day, end_date=day + timedelta(days=30),
+                      category_id=i % 7 or None)
+    obj = model(id=i, amount=amount, date=day, description=f"item {i}" if i % 3 else None)
+    if model is Expense:
+        obj.category_id = i % 7 or None
+    if model is Savings and i % 2:
+        obj.target_amount, obj.target_date = amount * 10, day + timedelta(days=365)
+    return obj
+
+
+class Command(BaseCommand):
+    help = "Compare DRF ModelSerializer output with the FastSerializer path on synthetic rows."
+
+    serializers = [
+        (Expense, ExpenseSerializer),
+        (Income, IncomeSerializer),
+        (Savings, SavingsSerializer),
+        (Budget, BudgetSerializer),
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        for rows in options['rows']:
+            for model, serializer_class in self.serializers:
+                instances = [synthetic(model, i) for i in range(rows)]
+                fast = FastSerializer(serializer_class)
+                values = [{name: getattr(obj, model._meta.get_field(name).attname)
+                           for name in fast.fields} for obj in instances]
+
+                started = time.perf_counter()
+                expected = renderer.render(serializer_class(instances, many=True).data)
+                drf = time.perf_counter() - started
+
+                started = time.perf_counter()
+                actual = renderer.render(fast.to_representation(values))
+                quick = time.perf_counter() - started
+
+                if actual != expected:
+                    raise CommandError(f"{serializer_class.__name__}: fast output differs at {rows} rows.")
+                self.stdout.write(
+                    f"{serializer_class.__name__:<18} rows={rows:<7} "
+                    f"drf={rows / drf:>9.0f} rows/s fast={rows / quick:>9.0f} rows/s "
+                    f"speedup={drf / quick:.1f}x")
@@ -0,0 +1,79 @@
+import json
+import platform
+import subprocess
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from expenses.benchmarks import LedgerBenchmarks
+from expenses.models import Budget, Expense, Income, Savings, User
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Time the overview, aggregation, import/export and auth paths against the "
+            "current database and print the results as JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Username to benchmark (defaults to the user with most expenses).")
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--import-rows', type=int, default=1000)
+        parser.add_argument('--only', nargs='+', metavar='NAME', help="Run only these benchmarks.")
+        parser.add_argument('--output', help="Write the JSON here instead of stdout.")
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"User {username!r} does not exist.")
+
+        user = User.objects.annotate(n=Count('expense')).order_by('-n').first()
+        if user is None:
+            raise CommandError("No users to benchmark against; run seed_ledger first.")
+        return user
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        suite = LedgerBenchmarks(user, import_rows=options['import_rows'])
+        unknown = set(options['only'] or ()) - set(suite.all_benchmarks())
+        if unknown:
+            raise CommandError(f"Unknown benchmark(s): {', '.join(sorted(unknown))}.")
+
+        report = {
+            'revision': git_revision(),
+            'started_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'connections': {
+                'max_age': connection.settings_dict['CONN_MAX_AGE'],
+                'health_checks': connection.settings_dict['CONN_HEALTH_CHECKS'],
+                'pool': bool(connection.settings_dict['OPTIONS'].get('pool')),
+            },
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'repeat': options['repeat'],
+            'user': user.username,
+            'rows': {
+                model.__name__.lower(): model.objects.filter(user=user).count()
+                for model in (Expense, Income, Savings, Budget)
+            },
+            'results': suite.run(options['repeat'], options['only']),
+        }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fileobj:
+                fileobj.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}."))
+        else:
+            self.stdout.write(output)
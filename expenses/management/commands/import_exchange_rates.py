@@ -0,0 +1,67 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers
+
+from expenses import rollups
+from expenses.caching import bump_ledger_version_on_commit
+from expenses.currency import load_rates
+from expenses.imports import FORMATS, UnreadableFile, guess_format, iter_rows
+from expenses.models import ARCHIVED_MODELS, Budget, Expense, Income, Savings
+from expenses.serializers import ExchangeRateSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Load exchange rates (currency, date, rate: the value of one unit in the "
+        "base currency) from a CSV or JSON-lines file, then rebuild the rollups of "
+        "users holding amounts in those currencies."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS,
+                            help="Defaults to jsonl for .jsonl/.ndjson files and csv otherwise.")
+        parser.add_argument('--through', type=date.fromisoformat,
+                            help="Carry the last rate of each currency forward to this date.")
+        parser.add_argument('--no-rebuild', action='store_true',
+                            help="Leave rollups and cached reports as they are.")
+
+    def parse(self, rows):
+        validator = ExchangeRateSerializer()
+        quotes = []
+        for number, row in enumerate(rows, start=1):
+            try:
+                if '_invalid' in row:
+                    raise serializers.ValidationError("Row is not a JSON object.")
+                data = validator.run_validation(row)
+            except serializers.ValidationError as exc:
+                raise CommandError(f"row {number}: {exc.detail}")
+            quotes.append((data['currency'], data['date'], data['rate']))
+        return quotes
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or guess_format(options['path'])
+        with open(options['path'], 'rb') as fileobj:
+            try:
+                quotes = self.parse(iter_rows(fileobj, fmt))
+            except UnreadableFile as exc:
+                raise CommandError(str(exc))
+        if not quotes:
+            raise CommandError("No rates in file.")
+
+        written = load_rates(quotes, options['through'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {written} daily rates from {len(quotes)} quotes."))
+        if options['no_rebuild']:
+            return
+
+        currencies = {currency for currency, _, _ in quotes}
+        user_ids = set()
+        for model in (Expense, Income, Savings, Budget, *ARCHIVED_MODELS.values()):
+            user_ids.update(model.objects.filter(currency__in=currencies)
+                            .values_list('user', flat=True).distinct())
+        if user_ids:
+            rollups.rebuild(list(user_ids))
+            bump_ledger_version_on_commit(*user_ids)
+        self.stdout.write(f"Rebuilt rollups of {len(user_ids)} users.")
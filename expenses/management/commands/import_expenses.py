@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.imports import FORMATS, guess_format, import_expenses, iter_rows
+from expenses.models import User
+
+
+class Command(BaseCommand):
+    help = "Import a CSV or JSON-lines file of expenses for a user."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS,
+                            help="Defaults to jsonl for .jsonl/.ndjson files and csv otherwise.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']!r} does not exist.")
+
+        fmt = options['format'] or guess_format(options['path'])
+        started = time.perf_counter()
+        with open(options['path'], 'rb') as fileobj:
+            result = import_expenses(user, iter_rows(fileobj, fmt), options['chunk_size'])
+        elapsed = time.perf_counter() - started
+
+        for error in result['errors']:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['created']} of {result['rows']} rows in {elapsed:.2f}s "
+            f"({result['rows'] / elapsed if elapsed else 0:.0f} rows/s)."))
+        if not result['complete']:
+            raise CommandError(f"Stopped at row {result['errors'][-1]['row']}: the file is not readable.")
@@ -0,0 +1,32 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from expenses.recurring import materialize_due
+
+
+class Command(BaseCommand):
+    help = "Create the Expense rows of every recurring expense that has fallen due."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--date', type=date.fromisoformat,
+                            help="Materialize as of this date (defaults to today).")
+        parser.add_argument('--every', type=int, metavar='SECONDS',
+                            help="Keep running, materializing every SECONDS seconds.")
+
+    def run_once(self, options):
+        today = options['date'] or timezone.localdate()
+        started = time.perf_counter()
+        processed, created = materialize_due(today, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Materialized {created} expenses from {processed} recurring expenses "
+            f"due by {today} in {time.perf_counter() - started:.2f}s."))
+
+    def handle(self, *args, **options):
+        self.run_once(options)
+        while options['every']:
+            time.sleep(options['every'])
+            self.run_once(options)
@@ -0,0 +1,28 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.partitioning import partition
+
+
+class Command(BaseCommand):
+    help = (
+        "Range-partition the expense and income tables by year (PostgreSQL only). "
+        "The first run rebuilds each table as a partitioned one in a single "
+        "transaction, locking it for the duration, so run it in a maintenance "
+        "window; later runs (e.g. yearly from cron) only add missing partitions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--through', type=int, metavar='YEAR',
+                            help="Create partitions up to this year (defaults to next year).")
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        try:
+            created = partition(options['through'], options['database'])
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc))
+
+        for table, partitions in created.items():
+            self.stdout.write(f"{table}: {', '.join(partitions) or 'up to date'}")
+        self.stdout.write(self.style.SUCCESS("Ledger tables are partitioned."))
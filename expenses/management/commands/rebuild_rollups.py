@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses import rollups
+from expenses.models import User, MonthlyRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly expense/income rollups from the raw ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only rebuild this username's rollups.")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']!r} does not exist.")
+
+        rollups.rebuild([user] if user is not None else None)
+
+        rows = MonthlyRollup.objects.all()
+        if user is not None:
+            rows = rows.filter(user=user)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows.count()} rollup rows."))
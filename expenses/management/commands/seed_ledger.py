@@ -0,0 +1,55 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from expenses.models import User
+from expenses.seeding import CATEGORIES, LedgerSeeder
+
+
+class Command(BaseCommand):
+    help = "Fill the database with synthetic users and ledgers for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--expenses', type=int, default=1000, help="Expenses per user.")
+        parser.add_argument('--extra-incomes', type=int, default=12,
+                            help="Irregular incomes per user, on top of a monthly salary.")
+        parser.add_argument('--categories', type=int, default=len(CATEGORIES),
+                            choices=range(1, len(CATEGORIES) + 1), metavar='N',
+                            help=f"Categories per user (at most {len(CATEGORIES)}).")
+        parser.add_argument('--days', type=int, default=365,
+                            help="Days of history, ending at --end.")
+        parser.add_argument('--end', type=date.fromisoformat,
+                            help="Last day of the history (defaults to today).")
+        parser.add_argument('--prefix', default='seed',
+                            help="Usernames are <prefix><n>.")
+        parser.add_argument('--password', default='password')
+        parser.add_argument('--seed', type=int, help="Random seed, for repeatable data.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        usernames = [f"{options['prefix']}{n}" for n in range(options['users'])]
+        taken = list(User.objects.filter(username__in=usernames).values_list('username', flat=True)[:5])
+        if taken:
+            raise CommandError(f"Users already exist ({', '.join(taken)}); pick another --prefix.")
+
+        end = options['end'] or timezone.localdate()
+        seeder = LedgerSeeder(end - timedelta(days=options['days'] - 1), end,
+                              seed=options['seed'], batch_size=options['batch_size'])
+
+        started = time.perf_counter()
+        counts = seeder.seed(
+            usernames,
+            password=options['password'],
+            categories=options['categories'],
+            expenses=options['expenses'],
+            extra_incomes=options['extra_incomes'],
+        )
+        elapsed = time.perf_counter() - started
+
+        total = sum(counts.values())
+        summary = ', '.join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {summary} in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} rows/s)."))
@@ -1,7 +1,22 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
 
+def base_currency():
+    """The currency exchange rates are quoted in and reports are totalled in."""
+    return getattr(settings, 'EXPENSES_BASE_CURRENCY', 'USD')
+
+
+def rate_relation(date_field='date'):
+    # Not a column: joins ExchangeRate on (currency, date) so amounts can be
+    # converted in SQL, e.g. F('amount') * F('rate__rate').
+    return models.ForeignObject(
+        ExchangeRate, on_delete=models.DO_NOTHING, related_name='+', null=True,
+        from_fields=['currency', date_field], to_fields=['currency', 'date'])
+
+
 class User(AbstractUser):
     profile_picture = models.ImageField(
         upload_to='profile_pics/', blank=True, null=True)
@@ -17,10 +32,33 @@ class User(AbstractUser):
         'auth.Permission', related_name='custom_user_permissions_set', blank=True)
 
 
+class ExchangeRate(models.Model):
+    """Value of one unit of ``currency`` in the base currency on ``date``."""
+    currency = models.CharField(max_length=3)
+    date = models.DateField()
+    rate = models.DecimalField(max_digits=18, decimal_places=8)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['currency', 'date'],
+                                    name='exchange_rate_currency_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.currency} {self.date} {self.rate}"
+
+
 class ExpenseCategory(models.Model):
     name = models.CharField(max_length=100)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     description = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at'],
+                         name='category_user_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -31,10 +69,29 @@ class Expense(models.Model):
     category = models.ForeignKey(
         ExpenseCategory, on_delete=models.SET_NULL, null=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default=base_currency)
     description = models.TextField(blank=True, null=True)
+    # Maintained from description by a database trigger (see search.install).
+    search_vector = SearchVectorField(null=True, editable=False)
     date = models.DateField()
+    rate = rate_relation()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at'],
+                         name='expense_user_updated_idx'),
+            # Overview pagination and date-range reports; amount is carried
+            # in the index so sums can be answered by an index-only scan.
+            models.Index(fields=['user', 'date', 'id'], include=['amount', 'currency'],
+                         name='expense_user_date_idx'),
+            models.Index(fields=['user', 'category', 'date'], include=['amount', 'currency'],
+                         condition=models.Q(category__isnull=False),
+                         name='expense_user_cat_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.amount} - {self.category}"
 
@@ -42,10 +99,23 @@ class Expense(models.Model):
 class Income(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default=base_currency)
     description = models.TextField(blank=True, null=True)
+    search_vector = SearchVectorField(null=True, editable=False)
     date = models.DateField()
+    rate = rate_relation()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at'],
+                         name='income_user_updated_idx'),
+            models.Index(fields=['user', 'date', 'id'], include=['amount', 'currency'],
+                         name='income_user_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.amount}"
 
@@ -55,10 +125,24 @@ class Budget(models.Model):
     category = models.ForeignKey(
         ExpenseCategory, on_delete=models.SET_NULL, null=True)
     limit = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default=base_currency)
     start_date = models.DateField()
     end_date = models.DateField()
+    rate = rate_relation('start_date')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at'],
+                         name='budget_user_updated_idx'),
+            models.Index(fields=['user', 'start_date', 'end_date'],
+                         name='budget_user_window_idx'),
+            models.Index(fields=['user', 'start_date', 'id'],
+                         name='budget_user_start_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.category} - {self.limit}"
 
@@ -72,6 +156,19 @@ class RecurringExpense(models.Model):
     recurrence_period = models.CharField(max_length=20, choices=[(
         'daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')])
     next_due_date = models.DateField()
+    # Day a monthly schedule falls on once next_due_date has been clamped to
+    # the end of a shorter month; null means next_due_date's own day.
+    day_of_month = models.PositiveSmallIntegerField(blank=True, null=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at'],
+                         name='recurring_user_updated_idx'),
+            models.Index(fields=['next_due_date', 'id'],
+                         name='recurring_due_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.amount} - {self.recurrence_period}"
@@ -80,12 +177,131 @@ class RecurringExpense(models.Model):
 class Savings(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default=base_currency)
     description = models.TextField(blank=True, null=True)
     date = models.DateField()
+    rate = rate_relation()
     target_amount = models.DecimalField(
         max_digits=10, decimal_places=2, blank=True, null=True)
     target_date = models.DateField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at'],
+                         name='savings_user_updated_idx'),
+            models.Index(fields=['user', 'date', 'id'], include=['amount', 'currency'],
+                         name='savings_user_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.amount} - {self.date}"
+
+
+class ArchivedExpense(models.Model):
+    """
+    Expense moved out of the hot table by ``archive_ledger``; same columns
+    and id, read-only. Rollups keep counting it.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    category = models.ForeignKey(
+        ExpenseCategory, on_delete=models.SET_NULL, null=True, related_name='+')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default=base_currency)
+    description = models.TextField(blank=True, null=True)
+    date = models.DateField()
+    rate = rate_relation()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date', 'id'],
+                         name='archived_expense_user_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.amount} - {self.date} (archived)"
+
+
+class ArchivedIncome(models.Model):
+    """Income moved out of the hot table by ``archive_ledger``."""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default=base_currency)
+    description = models.TextField(blank=True, null=True)
+    date = models.DateField()
+    rate = rate_relation()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date', 'id'],
+                         name='archived_income_user_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.amount} - {self.date} (archived)"
+
+
+# Hot table -> archive table of the models ``archive_ledger`` moves.
+ARCHIVED_MODELS = {
+    Expense: ArchivedExpense,
+    Income: ArchivedIncome,
+}
+
+# Models pointing at ExpenseCategory with on_delete=SET_NULL.
+CATEGORIZED_MODELS = (Expense, Budget, RecurringExpense, ArchivedExpense)
+
+
+class MonthlyRollup(models.Model):
+    KIND_CHOICES = [('expense', 'Expense'), ('income', 'Income')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    month = models.DateField()
+    category = models.ForeignKey(
+        ExpenseCategory, on_delete=models.CASCADE, null=True, blank=True)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'kind', 'month', 'category'],
+                condition=models.Q(category__isnull=False),
+                name='rollup_unique_category'),
+            models.UniqueConstraint(
+                fields=['user', 'kind', 'month'],
+                condition=models.Q(category__isnull=True),
+                name='rollup_unique_uncategorized'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'kind', 'month'],
+                         name='rollup_user_kind_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.kind} - {self.month:%Y-%m} - {self.total}"
+
+
+class Tombstone(models.Model):
+    """Records a deleted ledger row so sync clients can drop their copy."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=30)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'],
+                         name='tombstone_user_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.kind} #{self.object_id}"
@@ -0,0 +1,94 @@
+import base64
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+
+class KeysetPagination:
+    """
+    Cursor pagination over ``(date_field, id)``, newest first. The field may
+    be a date or a timestamp (e.g. ``updated_at`` for the sync).
+
+    The cursor is the position of the last row of the previous page, so each
+    page is a single indexed range scan no matter how deep the client goes.
+    """
+    page_size_query_param = 'page_size'
+
+    def __init__(self, date_field='date'):
+        self.date_field = date_field
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, 'EXPENSES_PAGE_SIZE', 100)
+        max_page_size = getattr(settings, 'EXPENSES_MAX_PAGE_SIZE', 1000)
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw is None:
+            return page_size
+        try:
+            page_size = int(raw)
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: 'Must be an integer.'})
+        if page_size < 1:
+            raise ValidationError({self.page_size_query_param: 'Must be positive.'})
+        return min(page_size, max_page_size)
+
+    def position(self, obj):
+        if isinstance(obj, dict):
+            return obj[self.date_field], obj['id']
+        return getattr(obj, self.date_field), obj.pk
+
+    def encode_cursor(self, obj):
+        position, pk = self.position(obj)
+        value = f"{position.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(value.encode()).decode()
+
+    def decode_cursor(self, cursor, param):
+        try:
+            value = base64.urlsafe_b64decode(cursor.encode()).decode()
+            position, pk = value.split('|')
+            try:
+                position = date.fromisoformat(position)
+            except ValueError:
+                position = datetime.fromisoformat(position)
+            return position, int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise ValidationError({param: 'Invalid cursor.'})
+
+    def paginate_queryset(self, queryset, request, cursor_param, page_size=None):
+        return self.paginate_querysets([queryset], request, cursor_param, page_size)
+
+    def paginate_querysets(self, querysets, request, cursor_param, page_size=None):
+        """
+        Paginate the rows of several querysets as one sequence, e.g. a table
+        and its archive (ids must not overlap). Each is read with the same
+        range scan and the pages are merged.
+        """
+        if page_size is None:
+            page_size = self.get_page_size(request)
+        return self.page(querysets, request.query_params.get(cursor_param), cursor_param, page_size)
+
+    def page(self, querysets, cursor, cursor_param, page_size):
+        """The rows after ``cursor`` (None for the first page) and the next cursor."""
+        after = None
+        if cursor:
+            position, pk = self.decode_cursor(cursor, cursor_param)
+            after = Q(**{f'{self.date_field}__lt': position}) | \
+                Q(**{self.date_field: position, 'id__lt': pk})
+
+        rows = []
+        for queryset in querysets:
+            queryset = queryset.order_by(f'-{self.date_field}', '-id')
+            if after is not None:
+                queryset = queryset.filter(after)
+            # One extra row tells us whether another page exists.
+            rows.extend(queryset[:page_size + 1])
+        if len(querysets) > 1:
+            rows.sort(key=self.position, reverse=True)
+            rows = rows[:page_size + 1]
+
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = self.encode_cursor(rows[-1])
+        return rows, next_cursor
@@ -0,0 +1,126 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import search
+from .models import Expense, Income
+
+# Range-partitioned by ``date``, one partition per year plus a default one.
+PARTITIONED_MODELS = (Expense, Income)
+
+
+def is_partitioned(cursor, table):
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = %s", [table])
+    return cursor.fetchone() is not None
+
+
+def year_partition(table, year):
+    return f"{table}_y{year}"
+
+
+def create_year_partition(cursor, table, year):
+    cursor.execute(
+        f"CREATE TABLE {year_partition(table, year)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')")
+
+
+def existing_partitions(cursor, table):
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = %s", [table])
+    return {name for name, in cursor.fetchall()}
+
+
+def add_year_partitions(cursor, table, years):
+    """
+    Create the yearly partitions of ``years`` that are missing, moving any
+    of their rows out of the default partition; returns the ones created.
+    """
+    default = f"{table}_default"
+    existing = existing_partitions(cursor, table)
+    created = []
+    for year in years:
+        name = year_partition(table, year)
+        if name in existing:
+            continue
+        start, end = f"{year}-01-01", f"{year + 1}-01-01"
+        # A new range may not overlap rows already in the default partition.
+        cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {default}")
+        create_year_partition(cursor, table, year)
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {default} WHERE date >= '{start}' AND date < '{end}' "
+            f"RETURNING *) INSERT INTO {table} SELECT * FROM moved")
+        cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT")
+        created.append(name)
+    return created
+
+
+def convert(cursor, schema_editor, model, years):
+    """
+    Replace ``model``'s table with a partitioned copy: the rows are loaded
+    before the keys, foreign keys and indexes are rebuilt on the parent.
+    PostgreSQL requires the primary key to include the partition key, so it
+    becomes (id, date); ids stay unique as they come from one sequence.
+    """
+    table = model._meta.db_table
+    old = f"{table}_unpartitioned"
+    sequence = f"{table}_partitioned_id_seq"
+
+    cursor.execute(f"ALTER TABLE {table} RENAME TO {old}")
+    cursor.execute(
+        f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING STORAGE) "
+        f"PARTITION BY RANGE (date)")
+    for year in years:
+        create_year_partition(cursor, table, year)
+    cursor.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+    cursor.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+    cursor.execute(f"CREATE SEQUENCE {sequence} OWNED BY {table}.id")
+    cursor.execute(f"SELECT setval('{sequence}', COALESCE(MAX(id), 0) + 1, false) FROM {table}")
+    cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+    cursor.execute(f"DROP TABLE {old}")
+
+    cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, date)")
+    for field in model._meta.concrete_fields:
+        if field.remote_field and field.db_constraint:
+            schema_editor.execute(schema_editor._create_fk_sql(model, field, '_fk'))
+        if field.db_index and not field.unique:
+            schema_editor.execute(schema_editor._create_index_sql(model, fields=[field]))
+    for index in model._meta.indexes:
+        schema_editor.add_index(model, index)
+
+
+def partition(through=None, using='default'):
+    """
+    Range-partition the ledger tables by year on PostgreSQL, converting
+    them on first run, and make sure a partition exists for every year up
+    to ``through`` (default: next year). Runs in one transaction holding an
+    exclusive lock on the tables; returns the partitions created per table.
+    Raises ImproperlyConfigured on other databases.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        raise ImproperlyConfigured(
+            f"Partitioning needs PostgreSQL; database '{using}' is {connection.vendor}.")
+    through = through or timezone.localdate().year + 1
+
+    created = {}
+    with transaction.atomic(using=using), connection.cursor() as cursor, \
+            connection.schema_editor(atomic=False) as schema_editor:
+        for model in PARTITIONED_MODELS:
+            table = model._meta.db_table
+            cursor.execute(f"SELECT EXTRACT(YEAR FROM MIN(date))::int FROM {table}")
+            first = cursor.fetchone()[0] or through
+            years = range(min(first, through), through + 1)
+
+            if is_partitioned(cursor, table):
+                created[table] = add_year_partitions(cursor, table, years)
+            else:
+                convert(cursor, schema_editor, model, years)
+                created[table] = [year_partition(table, year) for year in years]
+    # The search trigger and indexes went with the old tables.
+    search.install(using)
+    return created
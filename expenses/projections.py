@@ -0,0 +1,115 @@
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.db.models import Sum
+
+from .currency import to_base
+from .models import MonthlyRollup, Savings
+
+DAYS_PER_MONTH = Decimal('30.436875')  # 365.2425 / 12
+CENT = Decimal('0.01')
+
+
+def months_back(month, count):
+    for _ in range(count):
+        month = (month - timedelta(days=1)).replace(day=1)
+    return month
+
+
+def monthly_net(user, on, months):
+    """
+    Average monthly income minus expenses over the ``months`` complete
+    months before ``on``, read from the rollups in one grouped query.
+    Months before the user's first activity in the window are not counted.
+    """
+    end = on.replace(day=1)
+    start = months_back(end, months)
+    totals = MonthlyRollup.objects.filter(
+        user=user, month__gte=start, month__lt=end,
+    ).values('month', 'kind').annotate(amount=Sum('total')).order_by()
+
+    net = Decimal('0')
+    first = None
+    for row in totals:
+        net += row['amount'] if row['kind'] == 'income' else -row['amount']
+        first = row['month'] if first is None else min(first, row['month'])
+    if first is None:
+        return Decimal('0')
+
+    active = (end.year - first.year) * 12 + end.month - first.month
+    return (net / active).quantize(CENT)
+
+
+def savings_goals(user):
+    """
+    The savings goals of ``user``: Savings rows with a target amount are
+    deposits towards the goal they share a target amount, target date and
+    currency with. Each goal carries its first deposit's id and description,
+    the sum of its deposits as ``amount``, the date of the latest one and
+    how many there are.
+    """
+    deposits = (
+        Savings.objects.filter(user=user, target_amount__isnull=False)
+        .order_by('date', 'id')
+        .values('id', 'description', 'amount', 'currency', 'date', 'target_amount', 'target_date')
+    )
+    goals = {}
+    for deposit in deposits.iterator():
+        key = deposit['target_amount'], deposit['target_date'], deposit['currency']
+        goal = goals.get(key)
+        if goal is None:
+            goals[key] = {**deposit, 'deposits': 1}
+        else:
+            goal['amount'] += deposit['amount']
+            goal['date'] = deposit['date']
+            goal['deposits'] += 1
+    return list(goals.values())
+
+
+def project_goals(user, on, months=6):
+    """
+    Progress and projected completion of every savings goal of ``user``
+    (see ``savings_goals``; its amount is what is saved so far).
+
+    Goals are funded one after another in deadline order from the average
+    monthly net cash flow, so each goal completes once the running total of
+    what is still missing, up to and including it, has been saved. This is
+    a plain loop over the goals in Decimal arithmetic, not a vectorized
+    computation: without NumPy there is nothing to vectorize it with, and a
+    user has few enough goals that the loop is cheap next to the queries.
+
+    Amounts stay in each goal's currency; the running total and the net cash
+    flow it is divided by are in the base currency.
+    """
+    goals = sorted(savings_goals(user), key=lambda goal: (
+        goal['target_date'] is None, goal['target_date'] or on, goal['id']))
+    net = monthly_net(user, on, months)
+
+    remaining = [max(goal['target_amount'] - goal['amount'], Decimal('0')) for goal in goals]
+    in_base = to_base(
+        (missing, goal['currency'], goal['date']) for goal, missing in zip(goals, remaining))
+    for goal, missing, backlog in zip(goals, remaining, accumulate(in_base)):
+        target = goal['target_amount']
+        goal['progress'] = round(float(min(goal['amount'] / target, 1)), 4) if target else 1.0
+        goal['remaining'] = missing
+        goal['cumulative_remaining'] = backlog
+
+        if not missing:
+            goal['projected_date'] = on
+        elif net > 0:
+            goal['projected_date'] = on + timedelta(days=int(backlog / net * DAYS_PER_MONTH))
+        else:
+            goal['projected_date'] = None
+
+        deadline = goal['target_date']
+        if deadline is None:
+            goal['required_monthly'] = None
+            goal['on_track'] = None
+            continue
+        months_left = max(Decimal((deadline - on).days) / DAYS_PER_MONTH, Decimal('1'))
+        goal['required_monthly'] = (missing / months_left).quantize(CENT)
+        projected = goal['projected_date']
+        goal['on_track'] = projected is not None and projected <= deadline
+
+    return {"on": on, "history_months": months, "monthly_net": net, "goals": goals}
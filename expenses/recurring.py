@@ -0,0 +1,82 @@
+import calendar
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import rollups
+from .caching import bump_ledger_version_on_commit
+from .models import Expense, RecurringExpense
+
+
+def advance(day, period, anchor=None):
+    """
+    The due date after ``day``. Monthly schedules fall on ``anchor`` (default
+    ``day``'s own day), clamped to the length of the month, so Jan 31 is
+    followed by Feb 29 and then Mar 31.
+    """
+    if period == 'daily':
+        return day + timedelta(days=1)
+    if period == 'weekly':
+        return day + timedelta(weeks=1)
+    if period == 'monthly':
+        year, month = divmod(day.month, 12)
+        year, month = day.year + year, month + 1
+        return day.replace(year=year, month=month,
+                           day=min(anchor or day.day, calendar.monthrange(year, month)[1]))
+    raise ValueError(f"Unknown recurrence period: {period!r}")
+
+
+def materialize_batch(today, batch_size):
+    """
+    Turn one batch of due recurring expenses into Expense rows, catching up
+    every missed period. Rows locked by a concurrent run are skipped.
+
+    Returns ``(recurring rows processed, expenses created)``.
+    """
+    with transaction.atomic():
+        due = list(
+            RecurringExpense.objects
+            .filter(next_due_date__lte=today)
+            .select_for_update(skip_locked=True)
+            .order_by('next_due_date', 'id')[:batch_size]
+        )
+        if not due:
+            return 0, 0
+
+        expenses = []
+        now = timezone.now()
+        for recurring in due:
+            day = recurring.next_due_date
+            anchor = recurring.day_of_month or day.day
+            while day <= today:
+                expenses.append(Expense(
+                    user_id=recurring.user_id,
+                    category_id=recurring.category_id,
+                    amount=recurring.amount,
+                    description=recurring.description,
+                    date=day,
+                ))
+                day = advance(day, recurring.recurrence_period, anchor)
+            recurring.next_due_date = day
+            if recurring.recurrence_period == 'monthly':
+                recurring.day_of_month = anchor
+            recurring.updated_at = now
+
+        Expense.objects.bulk_create(expenses, batch_size=1000)
+        RecurringExpense.objects.bulk_update(
+            due, ['next_due_date', 'day_of_month', 'updated_at'], batch_size=1000)
+        rollups.record(expenses)
+        bump_ledger_version_on_commit(*{recurring.user_id for recurring in due})
+
+    return len(due), len(expenses)
+
+
+def materialize_due(today, batch_size=500):
+    processed = created = 0
+    while True:
+        batch_processed, batch_created = materialize_batch(today, batch_size)
+        if not batch_processed:
+            return processed, created
+        processed += batch_processed
+        created += batch_created
@@ -0,0 +1,173 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Avg, Count, DecimalField, F, FilteredRelation, Q, Sum, Value, Window
+from django.db.models.functions import (
+    Coalesce, Lag, Rank, Round, TruncDay, TruncMonth, TruncWeek,
+)
+
+from .currency import in_base
+from .models import Expense, Income, Savings, Budget, MonthlyRollup
+
+
+SUMMARY_MODELS = {
+    'expenses': Expense,
+    'incomes': Income,
+    'savings': Savings,
+}
+
+PERIODS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+GROUP_BY_CHOICES = [*PERIODS, 'category']
+
+ROLLUP_SECTIONS = {
+    'expenses': 'expense',
+    'incomes': 'income',
+}
+
+
+def summarize(queryset, group_by):
+    """
+    Totals, counts and averages of ``amount`` grouped in the database, in
+    the base currency.
+
+    ``group_by`` is one of ``GROUP_BY_CHOICES``; periods come back as the
+    first day of the day/week/month they cover.
+    """
+    if group_by == 'category':
+        queryset = queryset.values(
+            'category', category_name=F('category__name')).order_by('category__name')
+    else:
+        queryset = queryset.annotate(
+            period=PERIODS[group_by]('date')).values('period').order_by('period')
+
+    return queryset.annotate(
+        total=Sum(in_base()),
+        count=Count('id'),
+        average=Avg(in_base()),
+    )
+
+
+def summarize_tables(querysets, group_by):
+    """
+    ``summarize`` over tables holding rows of one section (a table and its
+    archive), one grouped query each, merged per period or category.
+    """
+    key = 'category' if group_by == 'category' else 'period'
+    merged = {}
+    for queryset in querysets:
+        for row in summarize(queryset, group_by):
+            entry = merged.get(row[key])
+            if entry is None:
+                merged[row[key]] = dict(row)
+                continue
+            entry['total'] += row['total']
+            entry['count'] += row['count']
+            entry['average'] = entry['total'] / entry['count']
+
+    rows = list(merged.values())
+    if group_by == 'category':
+        rows.sort(key=lambda row: (row['category_name'] is None, row['category_name'] or ''))
+    else:
+        rows.sort(key=lambda row: row['period'])
+    return rows
+
+
+def can_use_rollups(section, group_by, start=None, end=None):
+    """Whether a summary can be read from MonthlyRollup instead of raw rows."""
+    if section not in ROLLUP_SECTIONS or group_by not in ('month', 'category'):
+        return False
+    # Rollups only answer whole months.
+    if start and start.day != 1:
+        return False
+    if end and (end + timedelta(days=1)).day != 1:
+        return False
+    return True
+
+
+def summarize_rollups(user, section, group_by, start=None, end=None):
+    queryset = MonthlyRollup.objects.filter(user=user, kind=ROLLUP_SECTIONS[section])
+    if start:
+        queryset = queryset.filter(month__gte=start)
+    if end:
+        queryset = queryset.filter(month__lte=end)
+
+    if group_by == 'category':
+        queryset = queryset.values(
+            'category', category_name=F('category__name')).order_by('category__name')
+    else:
+        queryset = queryset.values(period=F('month')).order_by('month')
+
+    rows = []
+    for row in queryset.annotate(total_sum=Sum('total'), count_sum=Sum('count')):
+        total, count = row.pop('total_sum'), row.pop('count_sum')
+        rows.append({**row, 'total': total, 'count': count,
+                     'average': total / count if count else total})
+    return rows
+
+
+def budget_status(user, on):
+    """
+    Every budget of ``user`` active on ``on`` annotated with what has been
+    spent in its category during its window, in a single grouped query.
+    Spending is converted to the budget's currency at its start date.
+    """
+    # The window goes into the JOIN condition so only in-window expenses are
+    # joined, via the (user, category, date) index.
+    window_expenses = FilteredRelation('category__expense', condition=Q(
+        category__expense__user=F('user'),
+        category__expense__date__gte=F('start_date'),
+        category__expense__date__lte=F('end_date'),
+    ))
+    money = DecimalField(max_digits=14, decimal_places=2)
+
+    return Budget.objects.filter(
+        user=user, start_date__lte=on, end_date__gte=on,
+    ).annotate(
+        window_expenses=window_expenses,
+        category_name=F('category__name'),
+        spent=Round(
+            Coalesce(Sum(in_base('window_expenses__amount', 'window_expenses__rate')),
+                     Value(0), output_field=money)
+            / Coalesce(F('rate__rate'), Value(Decimal('1'))),
+            2, output_field=money),
+    ).annotate(
+        remaining=F('limit') - F('spent'),
+    ).order_by('end_date', 'id')
+
+
+def category_analytics(user, start=None, end=None):
+    """
+    Monthly spend per category with window functions over the expense
+    rollups, in a single query: the running total of each category, its
+    previous month with spending (for month-over-month changes), its rank
+    within the month and the month's total (for its share).
+
+    ``start`` and ``end`` select the months they fall in. The windows run
+    over every month up to ``end``, so the first selected month still has
+    its previous month and the running totals carry the earlier spend; the
+    months before ``start`` are dropped afterwards.
+    """
+    queryset = MonthlyRollup.objects.filter(user=user, kind=ROLLUP_SECTIONS['expenses'])
+    if end:
+        queryset = queryset.filter(month__lte=end)
+
+    by_category = {'partition_by': [F('category')], 'order_by': F('month').asc()}
+    rows = queryset.values(
+        'month', 'category', 'total', 'count', category_name=F('category__name'),
+    ).annotate(
+        running_total=Window(Sum('total'), **by_category),
+        previous_month=Window(Lag('month'), **by_category),
+        previous_total=Window(Lag('total'), **by_category),
+        rank=Window(Rank(), partition_by=[F('month')], order_by=F('total').desc()),
+        month_total=Window(Sum('total'), partition_by=[F('month')]),
+    ).order_by('month', 'rank', 'category')
+    if start:
+        # A filter on month would apply before the windows; this stays after them.
+        first = start.replace(day=1)
+        return [row for row in rows if row['month'] >= first]
+    return rows
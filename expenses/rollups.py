@@ -0,0 +1,127 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from .currency import in_base, to_base
+from .models import ARCHIVED_MODELS, Expense, Income, MonthlyRollup
+
+
+ROLLUP_KINDS = {
+    Expense: 'expense',
+    Income: 'income',
+}
+
+
+def _date(instance):
+    return type(instance)._meta.get_field('date').to_python(instance.date)
+
+
+def _key(instance):
+    kind = ROLLUP_KINDS[type(instance)]
+    return (kind, instance.user_id, _date(instance).replace(day=1),
+            getattr(instance, 'category_id', None))
+
+
+def collect(deltas, instances, sign=1):
+    # Rollups are kept in the base currency.
+    instances = list(instances)
+    amounts = to_base(
+        (instance.amount, instance.currency, _date(instance)) for instance in instances)
+    for instance, amount in zip(instances, amounts):
+        entry = deltas[_key(instance)]
+        entry[0] += sign * amount
+        entry[1] += sign
+
+
+def new_deltas():
+    return defaultdict(lambda: [Decimal('0'), 0])
+
+
+def apply(deltas):
+    """
+    Add ``{(kind, user_id, month, category_id): [amount, count]}`` deltas to
+    the rollup table with one UPDATE per touched bucket.
+    """
+    for (kind, user_id, month, category_id), (amount, count) in deltas.items():
+        if not amount and not count:
+            continue
+
+        bucket = MonthlyRollup.objects.filter(
+            kind=kind, user_id=user_id, month=month, category_id=category_id)
+        changes = {'total': F('total') + amount, 'count': F('count') + count}
+        if not bucket.update(**changes):
+            try:
+                with transaction.atomic():
+                    MonthlyRollup.objects.create(
+                        kind=kind, user_id=user_id, month=month,
+                        category_id=category_id, total=amount, count=count)
+            except IntegrityError:
+                # Another writer created the bucket first.
+                bucket.update(**changes)
+
+        if count < 0:
+            bucket.filter(count__lte=0).delete()
+
+
+def record(instances, sign=1):
+    """Fold saved (``sign=1``) or deleted (``sign=-1``) rows into the rollups."""
+    deltas = new_deltas()
+    collect(deltas, [i for i in instances if type(i) in ROLLUP_KINDS], sign)
+    apply(deltas)
+
+
+def uncategorize(category_ids):
+    """Move the rollups of categories about to be deleted to no category."""
+    buckets = MonthlyRollup.objects.filter(category__in=category_ids)
+    deltas = new_deltas()
+    for rollup in buckets:
+        entry = deltas[(rollup.kind, rollup.user_id, rollup.month, None)]
+        entry[0] += rollup.total
+        entry[1] += rollup.count
+    buckets.delete()
+    apply(deltas)
+
+
+def rebuild(users=None):
+    """
+    Recompute the rollup table (or these users' slice of it) from raw rows,
+    archived ones included.
+    """
+    with transaction.atomic():
+        rollups = MonthlyRollup.objects.all()
+        if users is not None:
+            rollups = rollups.filter(user__in=users)
+        rollups.delete()
+
+        for model, kind in ROLLUP_KINDS.items():
+            group = ['user', 'month']
+            if kind == 'expense':
+                group.append('category')
+
+            # Archived rows still count, so their table is folded in too.
+            buckets = defaultdict(lambda: [Decimal('0'), 0])
+            for table in (model, ARCHIVED_MODELS[model]):
+                rows = table.objects.all()
+                if users is not None:
+                    rows = rows.filter(user__in=users)
+                grouped = rows.annotate(month=TruncMonth('date')).values(*group).annotate(
+                    total=Sum(in_base()), count=Count('id')).order_by()
+                for bucket in grouped.iterator(chunk_size=2000):
+                    entry = buckets[bucket['user'], bucket['month'], bucket.get('category')]
+                    entry[0] += bucket['total']
+                    entry[1] += bucket['count']
+
+            MonthlyRollup.objects.bulk_create(
+                (MonthlyRollup(
+                    kind=kind,
+                    user_id=user_id,
+                    month=month,
+                    category_id=category_id,
+                    total=total,
+                    count=count,
+                ) for (user_id, month, category_id), (total, count) in buckets.items()),
+                batch_size=1000,
+            )
@@ -0,0 +1,97 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections, transaction
+from django.db.models import F, FloatField, Value
+
+from .models import Expense, Income
+from .serializers import ExpenseSearchResultSerializer, IncomeSearchResultSerializer
+
+
+# section -> (model, result serializer); both have a ``search_vector``.
+SEARCH_SECTIONS = {
+    'expenses': (Expense, ExpenseSearchResultSerializer),
+    'incomes': (Income, IncomeSearchResultSerializer),
+}
+
+SEARCH_CONFIG = 'english'
+
+TRIGGER_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION expenses_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(NEW.description, ''));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def install_statements(model):
+    table = model._meta.db_table
+    return [
+        f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}",
+        # search_vector is in the column list because save() writes back
+        # whatever stale value the instance holds.
+        f"CREATE TRIGGER {table}_search_vector BEFORE INSERT OR UPDATE OF "
+        f"description, search_vector ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION expenses_search_vector()",
+        f"CREATE INDEX IF NOT EXISTS {table}_search_idx ON {table} USING gin (search_vector)",
+        f"CREATE INDEX IF NOT EXISTS {table}_description_trgm_idx "
+        f"ON {table} USING gin (description gin_trgm_ops)",
+        # Backfill rows written before the trigger existed.
+        f"UPDATE {table} SET description = description "
+        f"WHERE search_vector IS NULL AND description IS NOT NULL",
+    ]
+
+
+def install(using='default'):
+    """
+    Set up full-text search on PostgreSQL: the trigger that keeps
+    ``search_vector`` in step with ``description``, the GIN indexes over it
+    and over description trigrams, and a backfill. Idempotent; a no-op on
+    other databases, which search with ``icontains`` instead.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cursor.execute(TRIGGER_FUNCTION)
+        for model, _ in SEARCH_SECTIONS.values():
+            for statement in install_statements(model):
+                cursor.execute(statement)
+    return True
+
+
+def search(user, section, query, limit=50):
+    """
+    Rows of ``section`` whose description matches ``query``, best first.
+    Returns ``(mode, rows)``, each row annotated with its ``rank``.
+
+    On PostgreSQL ``query`` is a web-search style query (quoted phrases, OR,
+    -exclusions) over the GIN-indexed ``search_vector``; when nothing
+    matches, descriptions are compared by trigram word similarity instead,
+    so a misspelled merchant name still finds its rows. Other databases
+    fall back to ``icontains`` on every word (no ranking), enough for tests.
+    """
+    model, _ = SEARCH_SECTIONS[section]
+    rows = model.objects.filter(user=user)
+
+    if connections[rows.db].vendor != 'postgresql':
+        for word in query.split():
+            rows = rows.filter(description__icontains=word)
+        rows = rows.annotate(rank=Value(None, output_field=FloatField()))
+        return 'basic', list(rows.order_by('-date', '-id')[:limit])
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    matches = list(
+        rows.filter(search_vector=search_query)
+        .annotate(rank=SearchRank(F('search_vector'), search_query))
+        .order_by('-rank', '-date', '-id')[:limit]
+    )
+    if matches:
+        return 'fulltext', matches
+
+    # %> uses the trigram index; the similarity is computed for ranking only.
+    fuzzy = rows.filter(description__trigram_word_similar=query).annotate(
+        rank=TrigramWordSimilarity(query, 'description'),
+    ).order_by('-rank', '-date', '-id')[:limit]
+    return 'trigram', list(fuzzy)
@@ -0,0 +1,169 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+from functools import partial
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+
+from . import rollups
+from .caching import bump_ledger_version_on_commit
+from .models import Budget, Expense, ExpenseCategory, Income, RecurringExpense, Savings, User
+
+
+# name -> (median amount, relative weight of how often it is spent on)
+CATEGORIES = {
+    'Groceries': (45, 30),
+    'Dining': (25, 20),
+    'Transport': (15, 20),
+    'Utilities': (80, 4),
+    'Rent': (1200, 1),
+    'Health': (60, 3),
+    'Entertainment': (30, 8),
+    'Shopping': (70, 8),
+    'Travel': (350, 1),
+    'Subscriptions': (12, 5),
+}
+
+DESCRIPTIONS = {
+    'Groceries': ['Supermarket', 'Farmers market', 'Corner shop'],
+    'Dining': ['Lunch', 'Dinner out', 'Coffee', 'Takeaway'],
+    'Transport': ['Bus pass', 'Taxi', 'Fuel', 'Parking'],
+    'Utilities': ['Electricity', 'Water', 'Internet', 'Gas'],
+    'Rent': ['Monthly rent'],
+    'Health': ['Pharmacy', 'Doctor visit', 'Gym'],
+    'Entertainment': ['Cinema', 'Concert', 'Books', 'Games'],
+    'Shopping': ['Clothes', 'Electronics', 'Household'],
+    'Travel': ['Flights', 'Hotel', 'Train tickets'],
+    'Subscriptions': ['Streaming', 'Music', 'Cloud storage'],
+}
+
+
+def money(value):
+    return Decimal(f'{max(value, 0.01):.2f}')
+
+
+class LedgerSeeder:
+    """
+    Generates realistic ledgers (skewed category mix, log-normal amounts,
+    monthly salary, monthly budgets and savings) and writes them with
+    ``bulk_create`` in batches of ``batch_size``. The seeded users' rollups
+    are rebuilt at the end, so their ledgers read like ones built through
+    the API.
+    """
+
+    def __init__(self, start, end, seed=None, batch_size=5000):
+        self.start = start
+        self.end = end
+        self.days = (end - start).days + 1
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+
+    def day(self):
+        return self.start + timedelta(days=self.random.randrange(self.days))
+
+    def months(self):
+        month = self.start.replace(day=1)
+        while month <= self.end:
+            yield month
+            month = (month + timedelta(days=32)).replace(day=1)
+
+    def create_users(self, usernames, password):
+        # One hash for every account; hashing per user would dominate.
+        password = make_password(password)
+        return User.objects.bulk_create(
+            [User(username=username, password=password) for username in usernames],
+            batch_size=self.batch_size)
+
+    def create_categories(self, users, per_user):
+        names = list(CATEGORIES)[:per_user]
+        return ExpenseCategory.objects.bulk_create(
+            [ExpenseCategory(user=user, name=name) for user in users for name in names],
+            batch_size=self.batch_size)
+
+    def expenses(self, user, categories, count):
+        weights = [CATEGORIES[category.name][1] for category in categories]
+        for _ in range(count):
+            category = self.random.choices(categories, weights)[0] if categories else None
+            if category is None or self.random.random() < 0.05:
+                # A few uncategorized entries, as real ledgers have.
+                yield Expense(user=user, amount=money(self.random.lognormvariate(3, 1)),
+                              description=None, date=self.day())
+                continue
+            median = CATEGORIES[category.name][0]
+            yield Expense(
+                user=user,
+                category=category,
+                amount=money(median * self.random.lognormvariate(0, 0.5)),
+                description=self.random.choice(DESCRIPTIONS[category.name]),
+                date=self.day(),
+            )
+
+    def incomes(self, user, categories, extra):
+        salary = self.random.randrange(2500, 8000)
+        for month in self.months():
+            yield Income(user=user, amount=money(salary * self.random.uniform(0.98, 1.02)),
+                         description='Salary', date=month)
+        for _ in range(extra):
+            yield Income(user=user, amount=money(self.random.lognormvariate(5, 1)),
+                         description='Freelance', date=self.day())
+
+    def budgets(self, user, categories):
+        for month in self.months():
+            end = (month + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            for category in categories:
+                limit = CATEGORIES[category.name][0] * CATEGORIES[category.name][1]
+                yield Budget(user=user, category=category, limit=money(limit),
+                             start_date=month, end_date=end)
+
+    def savings(self, user, categories):
+        target = money(self.random.randrange(1000, 20000))
+        target_date = self.end + timedelta(days=self.random.randrange(90, 720))
+        for month in self.months():
+            yield Savings(user=user, amount=money(self.random.uniform(50, 600)),
+                          description='Monthly saving', target_amount=target,
+                          target_date=target_date, date=month)
+
+    def recurring(self, user, categories):
+        for category in categories:
+            if category.name in ('Rent', 'Subscriptions', 'Utilities'):
+                yield RecurringExpense(
+                    user=user, category=category, amount=money(CATEGORIES[category.name][0]),
+                    description=DESCRIPTIONS[category.name][0], recurrence_period='monthly',
+                    next_due_date=self.end + timedelta(days=self.random.randrange(1, 29)))
+
+    def write(self, model, objs):
+        """bulk_create ``objs`` batch by batch; returns how many were written."""
+        written = 0
+        while True:
+            batch = list(islice(objs, self.batch_size))
+            if not batch:
+                return written
+            model.objects.bulk_create(batch)
+            written += len(batch)
+
+    def seed(self, usernames, password='password', categories=len(CATEGORIES),
+             expenses=1000, extra_incomes=12):
+        """Create one ledger per username; returns the row count per model."""
+        users = self.create_users(usernames, password)
+        all_categories = self.create_categories(users, categories)
+        by_user = {}
+        for category in all_categories:
+            by_user.setdefault(category.user_id, []).append(category)
+
+        def per_user(make):
+            for user in users:
+                yield from make(user, by_user.get(user.pk, []))
+
+        counts = {
+            'users': len(users),
+            'categories': len(all_categories),
+            'expenses': self.write(Expense, per_user(partial(self.expenses, count=expenses))),
+            'incomes': self.write(Income, per_user(partial(self.incomes, extra=extra_incomes))),
+            'budgets': self.write(Budget, per_user(self.budgets)),
+            'savings': self.write(Savings, per_user(self.savings)),
+            'recurring_expenses': self.write(RecurringExpense, per_user(self.recurring)),
+        }
+        rollups.rebuild(users)
+        bump_ledger_version_on_commit(*(user.pk for user in users))
+        return counts
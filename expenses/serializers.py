@@ -1,27 +1,344 @@
+import decimal
+from datetime import timedelta
+from decimal import Decimal
+
 from rest_framework import serializers
-from .models import Expense, Income, Savings, Budget
+from rest_framework.settings import api_settings
+from .models import (
+    Expense, ExchangeRate, ExpenseCategory, Income, Savings, Budget, RecurringExpense, base_currency,
+)
+from .reports import GROUP_BY_CHOICES
+
+
+class OwnedCategoryField(serializers.PrimaryKeyRelatedField):
+    """
+    Category pk restricted to the requesting user's categories. They are
+    loaded once per serializer tree, so validating a batch of rows costs one
+    query rather than one per row.
+    """
+
+    def get_queryset(self):
+        return ExpenseCategory.objects.filter(user=self.context['request'].user)
+
+    def to_internal_value(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        if '_owned_categories' not in self.context:
+            self.context['_owned_categories'] = self.get_queryset().in_bulk()
+        try:
+            return self.context['_owned_categories'][int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class CurrencyField(serializers.CharField):
+    """Three-letter currency code, stored upper-case."""
+    default_error_messages = {
+        'invalid_code': 'Enter a three-letter currency code.',
+    }
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('min_length', 3)
+        kwargs.setdefault('max_length', 3)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data).upper()
+        if not (value.isascii() and value.isalpha()):
+            self.fail('invalid_code')
+        return value
+
+
+class ExchangeRateSerializer(serializers.ModelSerializer):
+    currency = CurrencyField()
+    rate = serializers.DecimalField(max_digits=18, decimal_places=8, min_value=Decimal('0'))
+
+    class Meta:
+        model = ExchangeRate
+        fields = ['currency', 'date', 'rate']
+        # Loading upserts on (currency, date); no per-row uniqueness query.
+        validators = []
+
+    def validate_currency(self, value):
+        if value == base_currency():
+            raise serializers.ValidationError("Rates are quoted in the base currency.")
+        return value
+
+
+class CategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ExpenseCategory
+        fields = ['id', 'name', 'description']
 
 
 class ExpenseSerializer(serializers.ModelSerializer):
+    currency = CurrencyField(required=False)
+    category = OwnedCategoryField(allow_null=True, required=False)
+
     class Meta:
         model = Expense
-        fields = ['id', 'amount', 'description', 'date', 'category']
+        fields = ['id', 'amount', 'currency', 'description', 'date', 'category']
+
+
+class ExpenseSearchResultSerializer(ExpenseSerializer):
+    rank = serializers.FloatField(read_only=True, allow_null=True)
+
+    class Meta(ExpenseSerializer.Meta):
+        fields = ExpenseSerializer.Meta.fields + ['rank']
+
+
+class ExpenseImportSerializer(ExpenseSerializer):
+    # Categories arrive by name and are resolved per batch by the importer.
+    class Meta(ExpenseSerializer.Meta):
+        fields = ['amount', 'currency', 'description', 'date']
+
+
+class ExpenseImportQuerySerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=['csv', 'jsonl'], required=False)
 
 
 class IncomeSerializer(serializers.ModelSerializer):
+    currency = CurrencyField(required=False)
+
     class Meta:
         model = Income
-        fields = ['id', 'amount', 'description', 'date']
+        fields = ['id', 'amount', 'currency', 'description', 'date']
+
+
+class IncomeSearchResultSerializer(IncomeSerializer):
+    rank = serializers.FloatField(read_only=True, allow_null=True)
+
+    class Meta(IncomeSerializer.Meta):
+        fields = IncomeSerializer.Meta.fields + ['rank']
 
 
 class SavingsSerializer(serializers.ModelSerializer):
+    currency = CurrencyField(required=False)
+
     class Meta:
         model = Savings
-        fields = ['id', 'amount', 'description',
+        fields = ['id', 'amount', 'currency', 'description',
                   'date', 'target_amount', 'target_date']
 
 
 class BudgetSerializer(serializers.ModelSerializer):
+    currency = CurrencyField(required=False)
+    category = OwnedCategoryField(allow_null=True, required=False)
+
     class Meta:
         model = Budget
-        fields = ['id', 'limit', 'start_date', 'end_date', 'category']
+        fields = ['id', 'limit', 'currency', 'start_date', 'end_date', 'category']
+
+    def validate(self, data):
+        start = data.get('start_date', getattr(self.instance, 'start_date', None))
+        end = data.get('end_date', getattr(self.instance, 'end_date', None))
+        if start and end and start > end:
+            raise serializers.ValidationError("start_date must be before end_date.")
+        return data
+
+
+class RecurringExpenseSerializer(serializers.ModelSerializer):
+    category = OwnedCategoryField(allow_null=True, required=False)
+
+    class Meta:
+        model = RecurringExpense
+        fields = ['id', 'amount', 'description', 'recurrence_period',
+                  'next_due_date', 'category']
+
+    def validate(self, data):
+        # A new due date sets a new monthly anchor.
+        if 'next_due_date' in data:
+            data['day_of_month'] = None
+        return data
+
+
+class SummarySerializer(serializers.Serializer):
+    total = serializers.DecimalField(max_digits=None, decimal_places=2)
+    count = serializers.IntegerField()
+    average = serializers.DecimalField(max_digits=None, decimal_places=2)
+
+
+class PeriodSummarySerializer(SummarySerializer):
+    period = serializers.DateField()
+
+
+class CategorySummarySerializer(SummarySerializer):
+    category = serializers.IntegerField(allow_null=True)
+    category_name = serializers.CharField(allow_null=True)
+
+
+class SummaryQuerySerializer(serializers.Serializer):
+    group_by = serializers.ChoiceField(choices=GROUP_BY_CHOICES, default='month')
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if data.get('start') and data.get('end') and data['start'] > data['end']:
+            raise serializers.ValidationError("start must be before end.")
+        return data
+
+
+class CategoryAnalyticsSerializer(serializers.Serializer):
+    month = serializers.DateField()
+    category = serializers.IntegerField(allow_null=True)
+    category_name = serializers.CharField(allow_null=True)
+    total = serializers.DecimalField(max_digits=None, decimal_places=2)
+    count = serializers.IntegerField()
+    running_total = serializers.DecimalField(max_digits=None, decimal_places=2)
+    previous_total = serializers.DecimalField(max_digits=None, decimal_places=2, allow_null=True)
+    change = serializers.DecimalField(max_digits=None, decimal_places=2, allow_null=True)
+    rank = serializers.IntegerField()
+    share = serializers.SerializerMethodField()
+
+    def to_representation(self, row):
+        # Lag() gives the category's previous month *with spending*; if that
+        # is not the calendar month before, it spent nothing last month.
+        row = dict(row)
+        last_month = (row['month'] - timedelta(days=1)).replace(day=1)
+        if row['previous_month'] is not None and row['previous_month'] != last_month:
+            row['previous_total'] = Decimal('0')
+        previous = row['previous_total']
+        row['change'] = None if previous is None else row['total'] - previous
+        return super().to_representation(row)
+
+    def get_share(self, row):
+        if not row['month_total']:
+            return None
+        return round(float(row['total'] / row['month_total']), 4)
+
+
+class CategoryAnalyticsQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if data.get('start') and data.get('end') and data['start'] > data['end']:
+            raise serializers.ValidationError("start must be before end.")
+        return data
+
+
+class SavingsGoalProjectionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    description = serializers.CharField(allow_null=True)
+    amount = serializers.DecimalField(max_digits=None, decimal_places=2)
+    currency = serializers.CharField()
+    target_amount = serializers.DecimalField(max_digits=None, decimal_places=2)
+    target_date = serializers.DateField(allow_null=True)
+    deposits = serializers.IntegerField()
+    progress = serializers.FloatField()
+    remaining = serializers.DecimalField(max_digits=None, decimal_places=2)
+    cumulative_remaining = serializers.DecimalField(max_digits=None, decimal_places=2)
+    required_monthly = serializers.DecimalField(max_digits=None, decimal_places=2, allow_null=True)
+    projected_date = serializers.DateField(allow_null=True)
+    on_track = serializers.BooleanField(allow_null=True)
+
+
+class SavingsProjectionSerializer(serializers.Serializer):
+    on = serializers.DateField()
+    history_months = serializers.IntegerField()
+    monthly_net = serializers.DecimalField(max_digits=None, decimal_places=2)
+    goals = SavingsGoalProjectionSerializer(many=True)
+
+
+class SavingsProjectionQuerySerializer(serializers.Serializer):
+    on = serializers.DateField(required=False)
+    months = serializers.IntegerField(min_value=1, max_value=60, default=6)
+
+
+class BudgetStatusSerializer(BudgetSerializer):
+    category_name = serializers.CharField(allow_null=True, read_only=True)
+    spent = serializers.DecimalField(max_digits=None, decimal_places=2, read_only=True)
+    remaining = serializers.DecimalField(max_digits=None, decimal_places=2, read_only=True)
+    utilization = serializers.SerializerMethodField()
+    over_limit = serializers.SerializerMethodField()
+
+    class Meta(BudgetSerializer.Meta):
+        fields = BudgetSerializer.Meta.fields + [
+            'category_name', 'spent', 'remaining', 'utilization', 'over_limit']
+
+    def get_utilization(self, obj):
+        if not obj.limit:
+            return None
+        return round(float(obj.spent / obj.limit), 4)
+
+    def get_over_limit(self, obj):
+        return obj.spent > obj.limit
+
+
+class BulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+
+class BudgetStatusQuerySerializer(serializers.Serializer):
+    on = serializers.DateField(required=False)
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    section = serializers.ChoiceField(choices=['expenses', 'incomes'], default='expenses')
+    limit = serializers.IntegerField(min_value=1, max_value=200, default=50)
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    section = serializers.ChoiceField(
+        choices=['expenses', 'incomes', 'savings'], default='expenses')
+    # Not "format": DRF reserves that query param for renderer selection.
+    file_format = serializers.ChoiceField(choices=['csv', 'ndjson'], default='csv')
+
+
+class FastSerializer:
+    """
+    Read-only fast path for a ModelSerializer: renders ``.values()`` rows
+    through converters compiled once per serializer class, producing the
+    same output as ``serializer_class(instances, many=True).data``.
+    """
+    _compiled = {}
+
+    def __init__(self, serializer_class):
+        if serializer_class not in self._compiled:
+            self._compiled[serializer_class] = [
+                (name, self.compile(field))
+                for name, field in serializer_class().fields.items()
+            ]
+        self.converters = self._compiled[serializer_class]
+        self.fields = [name for name, _ in self.converters]
+
+    @staticmethod
+    def compile(field):
+        if isinstance(field, serializers.DecimalField) and not field.localize \
+                and getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING) \
+                and not field.normalize_output:
+            # Same rounding as DecimalField.quantize, minus its per-call
+            # context copy.
+            context = decimal.getcontext().copy()
+            if field.max_digits is not None:
+                context.prec = field.max_digits
+            exponent = Decimal('.1') ** field.decimal_places
+            rounding = field.rounding
+            return lambda value: '{:f}'.format(
+                value.quantize(exponent, rounding=rounding, context=context))
+        if isinstance(field, serializers.DateField) \
+                and getattr(field, 'format', api_settings.DATE_FORMAT).lower() == 'iso-8601':
+            return lambda value: value.isoformat()
+        if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+            return None
+        if type(field) is serializers.IntegerField:
+            return int
+        if type(field) is serializers.CharField:
+            return str
+        return field.to_representation
+
+    def values(self, queryset):
+        return queryset.values(*self.fields)
+
+    def to_representation(self, rows):
+        converters = self.converters
+        return [
+            {name: value if value is None or convert is None else convert(value)
+             for name, convert in converters
+             for value in (row[name],)}
+            for row in rows
+        ]
@@ -0,0 +1,115 @@
+import contextvars
+from contextlib import contextmanager
+
+from django.contrib.auth.base_user import AbstractBaseUser
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import rollups, search, sync
+from .caching import bump_ledger_version_on_commit
+from .models import (
+    CATEGORIZED_MODELS, Budget, Expense, ExpenseCategory, Income, RecurringExpense, Savings,
+)
+
+# Set while a bulk endpoint deletes rows through the collector; it does the
+# rollup, tombstone and cache bookkeeping of the delete handlers below once
+# for the whole batch instead.
+bulk_deleting = contextvars.ContextVar('bulk_deleting', default=False)
+
+
+@contextmanager
+def batched_deletes():
+    token = bulk_deleting.set(True)
+    try:
+        yield
+    finally:
+        bulk_deleting.reset(token)
+
+
+@receiver(pre_save, sender=Expense)
+@receiver(pre_save, sender=Income)
+def remember_rollup_position(sender, instance, **kwargs):
+    instance._rollup_previous = None
+    if instance.pk and not instance._state.adding:
+        instance._rollup_previous = sender.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=Income)
+def update_rollup_on_save(sender, instance, **kwargs):
+    deltas = rollups.new_deltas()
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        rollups.collect(deltas, [previous], sign=-1)
+    rollups.collect(deltas, [instance])
+    rollups.apply(deltas)
+
+
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Income)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    if bulk_deleting.get():
+        return
+    rollups.record([instance], sign=-1)
+
+
+@receiver(pre_delete, sender=ExpenseCategory)
+def uncategorize_rollups(sender, instance, **kwargs):
+    if bulk_deleting.get():
+        return
+    # Expenses fall back to no category (SET_NULL), so their totals move to
+    # the uncategorized bucket instead of cascading away with the category.
+    rollups.uncategorize([instance.pk])
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=Income)
+@receiver(post_save, sender=Savings)
+@receiver(post_save, sender=Budget)
+@receiver(post_save, sender=ExpenseCategory)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Savings)
+@receiver(post_delete, sender=Budget)
+@receiver(post_delete, sender=ExpenseCategory)
+def invalidate_ledger_cache(sender, instance, **kwargs):
+    if bulk_deleting.get():
+        return
+    bump_ledger_version_on_commit(instance.user_id)
+
+
+@receiver(pre_delete, sender=ExpenseCategory)
+def touch_uncategorized(sender, instance, **kwargs):
+    if bulk_deleting.get():
+        return
+    # SET_NULL is a plain UPDATE that skips auto_now, so stamp the rows here
+    # for sync clients to pick up their new (empty) category.
+    now = timezone.now()
+    for model in CATEGORIZED_MODELS:
+        model.objects.filter(category=instance).update(updated_at=now)
+
+
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Savings)
+@receiver(post_delete, sender=Budget)
+@receiver(post_delete, sender=RecurringExpense)
+@receiver(post_delete, sender=ExpenseCategory)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    if bulk_deleting.get():
+        return
+    # Rows cascading away with their user take the tombstones with them.
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if issubclass(model, AbstractBaseUser):
+        return
+    sync.bury([instance])
+
+
+@receiver(post_migrate)
+def install_search(sender, using, **kwargs):
+    # Tables are created without migrations (``migrate --run-syncdb``), so
+    # the PostgreSQL-only search trigger and indexes are set up here.
+    if sender.name == 'expenses':
+        search.install(using)
@@ -0,0 +1,154 @@
+import base64
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import Budget, Expense, ExpenseCategory, Income, RecurringExpense, Savings, Tombstone
+from .pagination import KeysetPagination
+from .serializers import (
+    BudgetSerializer,
+    CategorySerializer,
+    ExpenseSerializer,
+    IncomeSerializer,
+    RecurringExpenseSerializer,
+    SavingsSerializer,
+)
+
+
+# section name -> (model, serializer); the name doubles as Tombstone.kind.
+SYNC_SECTIONS = {
+    'expenses': (Expense, ExpenseSerializer),
+    'incomes': (Income, IncomeSerializer),
+    'savings': (Savings, SavingsSerializer),
+    'budgets': (Budget, BudgetSerializer),
+    'recurring_expenses': (RecurringExpense, RecurringExpenseSerializer),
+    'categories': (ExpenseCategory, CategorySerializer),
+}
+
+TOMBSTONE_KINDS = {model: name for name, (model, _) in SYNC_SECTIONS.items()}
+
+
+def sync_overlap():
+    # Rows are stamped when they are written but only become visible when
+    # their transaction commits, so every sync re-reads a short window before
+    # the previous token. Clients apply rows as idempotent upserts.
+    return timedelta(seconds=getattr(settings, 'EXPENSES_SYNC_OVERLAP', 5))
+
+
+def tombstone_retention():
+    return timedelta(days=getattr(settings, 'EXPENSES_SYNC_TOMBSTONE_DAYS', 90))
+
+
+def encode_token(moment):
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode()
+
+
+def decode_token(token, param='since'):
+    try:
+        moment = datetime.fromisoformat(base64.urlsafe_b64decode(token.encode()).decode())
+    except (TypeError, ValueError, UnicodeError):
+        raise ValidationError({param: 'Invalid sync token.'})
+    if timezone.is_naive(moment):
+        raise ValidationError({param: 'Invalid sync token.'})
+    return moment
+
+
+def encode_page(moment, section, cursor):
+    """Continuation token of a full sync: where the next page starts."""
+    value = f"{moment.isoformat()}|{section}|{cursor or ''}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_page(token, sections, param='page'):
+    try:
+        moment, section, cursor = base64.urlsafe_b64decode(token.encode()).decode().split('|')
+        moment = datetime.fromisoformat(moment)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValidationError({param: 'Invalid page token.'})
+    if timezone.is_naive(moment) or section not in sections:
+        raise ValidationError({param: 'Invalid page token.'})
+    return moment, section, cursor or None
+
+
+def bury(instances):
+    """Record tombstones for deleted rows of the synced models."""
+    Tombstone.objects.bulk_create([
+        Tombstone(user_id=instance.user_id, kind=TOMBSTONE_KINDS[type(instance)],
+                  object_id=instance.pk)
+        for instance in instances if type(instance) in TOMBSTONE_KINDS
+    ])
+
+
+def prune_tombstones(now=None):
+    """Drop tombstones older than the retention window; returns the count."""
+    cutoff = (now or timezone.now()) - tombstone_retention()
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
+
+
+def get_changes(user, sections, since=None, page=None, page_size=100):
+    """
+    Rows of ``sections`` changed and ids deleted since the ``since`` moment.
+
+    Returns ``(token, full, data, next_page)``. ``full`` is true when
+    ``since`` is missing or older than the tombstone retention, in which
+    case every row is returned and the client should replace its copy
+    instead of merging. A full sync is served ``page_size`` rows at a time:
+    while ``next_page`` is set the client fetches it (passed back as
+    ``page``), and only the token of the last page should be stored.
+    """
+    if page is not None:
+        return get_full_page(user, sections, *decode_page(page, sections), page_size)
+
+    now = timezone.now()
+    full = since is None or since - sync_overlap() < now - tombstone_retention()
+    if full:
+        return get_full_page(user, sections, now, None, None, page_size)
+
+    start = since - sync_overlap()
+    deleted = defaultdict(list)
+    tombstones = Tombstone.objects.filter(
+        user=user, kind__in=sections, deleted_at__gte=start,
+    ).order_by('deleted_at', 'id').values_list('kind', 'object_id')
+    for kind, object_id in tombstones:
+        deleted[kind].append(object_id)
+
+    data = {}
+    for name in sections:
+        model, serializer_class = SYNC_SECTIONS[name]
+        queryset = model.objects.filter(user=user, updated_at__gte=start)
+        data[name] = {
+            "changed": serializer_class(queryset.order_by('updated_at', 'id'), many=True).data,
+            "deleted": deleted[name],
+        }
+    return encode_token(now), False, data, None
+
+
+def get_full_page(user, sections, moment, section, cursor, page_size):
+    """
+    One page of a full sync started at ``moment``, from ``cursor`` within
+    ``section`` on (the first section when None). Sections are walked in order, newest rows first; rows
+    changed after ``moment`` may be skipped, but the delta sync from the
+    final token returns them.
+    """
+    paginator = KeysetPagination('updated_at')
+    data = {name: {"changed": [], "deleted": []} for name in sections}
+    next_page = None
+    remaining = page_size
+    for name in sections[sections.index(section) if section else 0:]:
+        if not remaining:
+            next_page = encode_page(moment, name, None)
+            break
+        model, serializer_class = SYNC_SECTIONS[name]
+        rows, next_cursor = paginator.page(
+            [model.objects.filter(user=user)], cursor if name == section else None,
+            'page', remaining)
+        data[name]["changed"] = serializer_class(rows, many=True).data
+        remaining -= len(rows)
+        if next_cursor:
+            next_page = encode_page(moment, name, next_cursor)
+            break
+    return encode_token(moment), True, data, next_page
@@ -1,3 +1,685 @@
-from django.test import TestCase
+import json
+from datetime import date
+from unittest.mock import patch
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.db.models import Sum
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+from rest_framework.test import APIClient, APITestCase
+from rest_framework.throttling import BaseThrottle
+from rest_framework_simplejwt.tokens import AccessToken
+
+from expense_tracker import routers
+from expense_tracker.testing import QueryBudgetMixin
+from . import async_views
+from .caching import get_ledger_version
+from .currency import in_base, load_rates, rates, to_base
+from .models import (
+    Budget, ExchangeRate, Expense, ExpenseCategory, Income, MonthlyRollup, RecurringExpense,
+    Savings, Tombstone, User,
+)
+from .recurring import materialize_due
+from .rollups import rebuild
+from .views import FinancialSummaryView
+
+
+class QueryBudgetTests(QueryBudgetMixin, APITestCase):
+    budget_urlconf = 'expenses.urls'
+    query_budgets = {
+        'financial_overview': 6,
+        'financial_summary': 1,
+        'budget_status': 1,
+        'category_analytics': 1,
+        'ledger_search': 1,
+        'expense_import': 13,
+        'ledger_export': 2,
+        'ledger_sync': 6,
+        'expense-list': 1,
+        'expense-detail': 1,
+        'expense-bulk': 16,
+        'income-list': 1,
+        'income-detail': 1,
+        'income-bulk': 12,
+        'savings-list': 1,
+        'savings-detail': 1,
+        'savings-bulk': 6,
+        'savings-projections': 2,
+        'budget-list': 1,
+        'budget-detail': 1,
+        'budget-bulk': 6,
+        'recurring-expense-list': 1,
+        'recurring-expense-detail': 1,
+        'recurring-expense-bulk': 6,
+        'category-list': 1,
+        'category-detail': 1,
+        'category-bulk': 17,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create(username='budget')
+        self.client.force_authenticate(self.user)
+
+        # Half the ledger is in euros, so conversion is part of every budget.
+        rates.clear()
+        load_rates([('EUR', date(2024, 1, 1), Decimal('1.1')),
+                    ('EUR', date(2024, 3, 31), Decimal('1.2'))])
+
+        self.categories = [
+            ExpenseCategory.objects.create(user=self.user, name=f'Category {i}')
+            for i in range(10)]
+        for i in range(10):
+            category = self.categories[i % 3]
+            day = date(2024, 1 + i % 3, 1 + i)
+            currency = 'EUR' if i % 2 else 'USD'
+            Expense.objects.create(user=self.user, category=category, amount=i + 1,
+                                   currency=currency, description=f'Corner shop {i}', date=day)
+            Income.objects.create(user=self.user, amount=i + 1, currency=currency,
+                                  description=f'Invoice {i}', date=day)
+            Savings.objects.create(user=self.user, amount=i + 1, currency=currency, date=day)
+            Budget.objects.create(user=self.user, category=category, limit=100, currency=currency,
+                                  start_date=date(2024, 1, 1), end_date=date(2024, 3, 31))
+            RecurringExpense.objects.create(user=self.user, category=category, amount=i + 1,
+                                            recurrence_period='monthly', next_due_date=day)
+
+    def import_file(self, rows):
+        lines = [f'{i},2024-02-{i % 28 + 1:02d},Category {i % 3}\n' for i in range(rows)]
+        return SimpleUploadedFile(
+            'expenses.csv', ('amount,date,category\n' + ''.join(lines)).encode())
+
+    def ledger_requests(self, basename, model, row):
+        rows = model.objects.filter(user=self.user)
+        ids = list(rows.values_list('id', flat=True))
+        response = yield f'{basename}-list', 'get', None, None
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertCountEqual([result['id'] for result in results], ids)
+        response = yield f'{basename}-detail', 'get', {'pk': ids[0]}, None
+        self.assertEqual(response.data['id'], ids[0])
+        response = yield f'{basename}-bulk', 'post', None, [row] * 5
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(rows.count(), len(ids) + 5)
+        yield f'{basename}-bulk', 'patch', None, [{'id': pk, **row} for pk in ids[:5]]
+        for updated in rows.filter(id__in=ids[:5]).values(*row):
+            self.assertEqual({field: str(value) for field, value in updated.items()},
+                             {field: str(value) for field, value in row.items()})
+        yield f'{basename}-bulk', 'delete', None, {'ids': ids[5:]}
+        self.assertFalse(rows.filter(id__in=ids[5:]).exists())
+
+    def budget_requests(self):
+        category = self.categories[0].pk
+        expense_ids = set(Expense.objects.values_list('id', flat=True))
+        response = yield 'financial_overview', 'get', None, None
+        self.assertEqual({row['id'] for row in response.data['expenses']}, expense_ids)
+
+        # Euro amounts count at 1.1 (carried forward to the end of March).
+        response = yield 'financial_summary', 'get', None, {'group_by': 'category'}
+        self.assertEqual(
+            [(row['category'], Decimal(row['total'])) for row in response.data['expenses']],
+            [(self.categories[0].pk, Decimal('23.40')), (self.categories[1].pk, Decimal('16.00')),
+             (self.categories[2].pk, Decimal('18.60'))])
+
+        # Spending is in the budget's currency, euro budgets at their start date's rate.
+        response = yield 'budget_status', 'get', None, {'on': '2024-02-01'}
+        self.assertEqual(
+            [Decimal(budget['spent']) for budget in response.data['budgets']],
+            [Decimal(spent) for spent in (
+                '23.40', '14.55', '18.60', '21.27', '16.00',
+                '16.91', '23.40', '14.55', '18.60', '21.27')])
+
+        response = yield 'category_analytics', 'get', None, {'start': '2024-01-15', 'end': '2024-03-01'}
+        self.assertEqual(
+            [(row['month'], Decimal(row['total'])) for row in response.data['categories']],
+            [('2024-01-01', Decimal('23.40')), ('2024-02-01', Decimal('16.00')),
+             ('2024-03-01', Decimal('18.60'))])
+
+        response = yield 'ledger_search', 'get', None, {'q': 'corner shop'}
+        self.assertEqual({row['id'] for row in response.data['results']}, expense_ids)
+
+        response = yield 'ledger_export', 'get', None, None
+        # A header and one line per expense.
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 11)
+
+        response = yield 'ledger_sync', 'get', None, None
+        self.assertTrue(response.data['full'])
+        self.assertEqual({row['id'] for row in response.data['expenses']['changed']}, expense_ids)
+
+        response = yield 'savings-projections', 'get', None, {'on': '2024-04-15'}
+        self.assertEqual(response.data['goals'], [])
+
+        response = yield 'expense_import', 'post', None, {'file': self.import_file(20)}, 'multipart'
+        self.assertEqual((response.data['created'], response.data['failed']), (20, 0))
+
+        yield from self.ledger_requests(
+            'expense', Expense, {'amount': '5.00', 'currency': 'EUR', 'date': '2024-02-01',
+                                 'category': category})
+        yield from self.ledger_requests(
+            'income', Income, {'amount': '5.00', 'date': '2024-02-01'})
+        yield from self.ledger_requests(
+            'savings', Savings, {'amount': '5.00', 'date': '2024-02-01'})
+        yield from self.ledger_requests(
+            'budget', Budget, {'limit': '50.00', 'start_date': '2024-02-01',
+                               'end_date': '2024-02-29', 'category': category})
+        yield from self.ledger_requests(
+            'recurring-expense', RecurringExpense,
+            {'amount': '5.00', 'recurrence_period': 'weekly',
+             'next_due_date': '2024-02-01', 'category': category})
+        yield from self.ledger_requests(
+            'category', ExpenseCategory, {'name': 'Groceries'})
+
+
+class ArchiveSummaryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='archivist')
+        self.client.force_authenticate(self.user)
+        for day, amount in ((1, '10.00'), (2, '40.00'), (20, '100.00')):
+            Expense.objects.create(user=self.user, amount=Decimal(amount), date=date(2019, 1, day))
+
+    def monthly_total(self, start):
+        response = self.client.get('/expenses/api/financial-summary/', {
+            'group_by': 'month', 'start': start, 'end': '2019-01-31', 'include': 'expenses'})
+        self.assertEqual(response.status_code, 200)
+        return sum(Decimal(str(row['total'])) for row in response.data['expenses'])
+
+    def assert_totals(self):
+        # A whole-month range reads rollups, a partial one the raw rows.
+        self.assertEqual(self.monthly_total('2019-01-01'), Decimal('150.00'))
+        self.assertEqual(self.monthly_total('2019-01-02'), Decimal('140.00'))
+
+    def test_archived_rows_stay_in_summaries(self):
+        self.assert_totals()
+        call_command('archive_ledger', before=date(2020, 1, 1), stdout=StringIO())
+        self.assertFalse(Expense.objects.exists())
+        self.assert_totals()
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assert_totals()
+
+
+class LedgerCacheTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='cached')
+        self.client.force_authenticate(self.user)
+        self.category = ExpenseCategory.objects.create(user=self.user, name='Rent')
+        Expense.objects.create(
+            user=self.user, amount=Decimal('10.00'), date=date(2024, 1, 1), category=self.category)
+
+    def test_category_delete_invalidates_overview(self):
+        response = self.client.get('/expenses/api/financial-overview/')
+        etag = response['ETag']
+        self.assertEqual(response.data['expenses'][0]['category'], self.category.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/expenses/api/categories/{self.category.pk}/')
+        response = self.client.get('/expenses/api/financial-overview/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['expenses'][0]['category'])
+
+    def test_version_changes_on_commit(self):
+        version = get_ledger_version(self.user.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Expense.objects.create(user=self.user, amount=Decimal('5.00'), date=date(2024, 1, 2))
+            # Until the write commits, readers keep caching under the old version.
+            self.assertEqual(get_ledger_version(self.user.pk), version)
+        self.assertEqual(get_ledger_version(self.user.pk), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_ledger_version(self.user.pk), version)
+
+
+class RecurringTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='recurring')
+        self.client.force_authenticate(self.user)
+        self.recurring = RecurringExpense.objects.create(
+            user=self.user, amount=Decimal('20.00'), recurrence_period='monthly',
+            next_due_date=date(2024, 1, 31))
+
+    def expense_dates(self):
+        return list(Expense.objects.order_by('date').values_list('date', flat=True))
+
+    def test_month_end_schedule_keeps_its_day(self):
+        self.assertEqual(materialize_due(date(2024, 2, 29)), (1, 2))
+        self.recurring.refresh_from_db()
+        self.assertEqual(self.recurring.next_due_date, date(2024, 3, 31))
+
+        # A later run resumes from the clamped date without drifting.
+        materialize_due(date(2024, 6, 30))
+        self.assertEqual(self.expense_dates(), [
+            date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31),
+            date(2024, 4, 30), date(2024, 5, 31), date(2024, 6, 30)])
+        self.assertEqual(Expense.objects.aggregate(total=Sum('amount'))['total'], Decimal('120.00'))
+
+    def test_new_due_date_resets_anchor(self):
+        materialize_due(date(2024, 2, 1))
+        self.client.patch(f'/expenses/api/recurring-expenses/{self.recurring.pk}/',
+                          {'next_due_date': '2024-03-15'})
+        materialize_due(date(2024, 4, 30))
+        self.assertEqual(self.expense_dates()[-2:], [date(2024, 3, 15), date(2024, 4, 15)])
+
+
+class CategoryAnalyticsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='analyst')
+        self.client.force_authenticate(self.user)
+        self.category = ExpenseCategory.objects.create(user=self.user, name='Food')
+        for day, amount in ((date(2024, 1, 10), '30.00'), (date(2024, 2, 10), '50.00'),
+                            (date(2024, 3, 10), '20.00')):
+            Expense.objects.create(user=self.user, category=self.category,
+                                   amount=Decimal(amount), date=day)
+
+    def test_range_start_keeps_previous_month(self):
+        response = self.client.get('/expenses/api/category-analytics/', {'start': '2024-03-01'})
+        rows = response.data['categories']
+        self.assertEqual([row['month'] for row in rows], ['2024-03-01'])
+        self.assertEqual(Decimal(rows[0]['previous_total']), Decimal('50.00'))
+        self.assertEqual(Decimal(rows[0]['change']), Decimal('-30.00'))
+        self.assertEqual(Decimal(rows[0]['running_total']), Decimal('100.00'))
+        self.assertEqual(rows[0]['share'], 1.0)
+
+
+class SavingsProjectionTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='saver')
+        self.client.force_authenticate(self.user)
+        for month in (1, 2, 3):
+            Savings.objects.create(
+                user=self.user, amount=Decimal('100.00'), date=date(2024, month, 1),
+                target_amount=Decimal('1000.00'), target_date=date(2024, 12, 31))
+            Income.objects.create(user=self.user, amount=Decimal('200.00'), date=date(2024, month, 5))
+
+    def test_deposits_count_towards_one_goal(self):
+        response = self.client.get('/expenses/api/savings/projections/', {'on': '2024-04-01', 'months': 3})
+        self.assertEqual(Decimal(response.data['monthly_net']), Decimal('200.00'))
+        [goal] = response.data['goals']
+        self.assertEqual(goal['deposits'], 3)
+        self.assertEqual(Decimal(goal['amount']), Decimal('300.00'))
+        self.assertEqual(goal['progress'], 0.3)
+        self.assertEqual(Decimal(goal['remaining']), Decimal('700.00'))
+        self.assertEqual(Decimal(goal['cumulative_remaining']), Decimal('700.00'))
+        # 3.5 months of net cash flow.
+        self.assertEqual(goal['projected_date'], '2024-07-16')
+        self.assertTrue(goal['on_track'])
+
+    def test_goals_are_funded_in_deadline_order(self):
+        Savings.objects.create(user=self.user, amount=Decimal('100.00'), date=date(2024, 3, 2),
+                               target_amount=Decimal('500.00'), target_date=date(2024, 6, 30))
+        Savings.objects.create(user=self.user, amount=Decimal('50.00'), date=date(2024, 3, 2),
+                               target_amount=Decimal('250.00'))
+        response = self.client.get('/expenses/api/savings/projections/', {'on': '2024-04-01', 'months': 3})
+        # 400 missing first, then 700 and 200 more, at 200 a month.
+        self.assertEqual(
+            [(goal['target_date'], Decimal(goal['cumulative_remaining']), goal['projected_date'],
+              goal['on_track']) for goal in response.data['goals']],
+            [('2024-06-30', Decimal('400.00'), '2024-05-31', True),
+             ('2024-12-31', Decimal('1100.00'), '2024-09-15', True),
+             (None, Decimal('1300.00'), '2024-10-15', None)])
+
+
+class ExpenseImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='importer')
+        self.client.force_authenticate(self.user)
+
+    def test_only_imported_rows_create_categories(self):
+        rows = (
+            'amount,date,category\n'
+            '12.50,2024-02-01,Food\n'
+            'oops,2024-02-02,Ghost\n'
+            '3.00,2024-02-03,"   "\n'
+        )
+        response = self.client.post('/expenses/api/expenses/import/', {
+            'file': SimpleUploadedFile('expenses.csv', rows.encode())}, format='multipart')
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 1))
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+        self.assertEqual(
+            list(ExpenseCategory.objects.filter(user=self.user).values_list('name', flat=True)),
+            ['Food'])
+        self.assertCountEqual(
+            Expense.objects.values_list('category__name', 'amount'),
+            [('Food', Decimal('12.50')), (None, Decimal('3.00'))])
+
+    def upload(self, content):
+        return self.client.post('/expenses/api/expenses/import/', {
+            'file': SimpleUploadedFile('expenses.csv', content)}, format='multipart')
+
+    def test_unreadable_files_are_rejected(self):
+        for content, row in (
+                (b'amount,date\n1.00,2024-01-01\n2.00,2024-01-02,\xff\n', 2),
+                ('amount,date\n1.00,2024-01-01\n"{}",2024-01-02\n'.format('9' * 200000).encode(), 2)):
+            with self.subTest(row=row):
+                response = self.upload(content)
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.data['complete'])
+                self.assertEqual(response.data['errors'][-1]['row'], row)
+
+    def test_nothing_imported_is_a_bad_request(self):
+        response = self.upload(
+            'amount,date,category\n1.00,2024-01-01,{}\n'.format('x' * 101).encode())
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+        self.assertIn('category', response.data['errors'][0]['errors'])
+        self.assertFalse(ExpenseCategory.objects.exists())
+
+
+class CurrencyTests(APITestCase):
+    def setUp(self):
+        rates.clear()
+        self.user = User.objects.create(username='traveller')
+
+    def test_rates_loaded_after_a_miss_are_used(self):
+        day = date(2024, 5, 1)
+        self.assertEqual(to_base([(Decimal('10.00'), 'EUR', day)]), [Decimal('10.00')])
+        # Another worker loads the rate; this one must not keep the miss.
+        ExchangeRate.objects.create(currency='EUR', date=day, rate=Decimal('1.1'))
+        self.assertEqual(to_base([(Decimal('10.00'), 'EUR', day)]), [Decimal('11.00')])
+
+    def test_sql_and_python_conversion_agree(self):
+        load_rates([('EUR', date(2024, 5, 1), Decimal('1.1')),
+                    ('EUR', date(2024, 5, 3), Decimal('1.3'))])
+        for day, amount in ((1, '10.00'), (2, '3.33'), (3, '1.00')):
+            Expense.objects.create(user=self.user, amount=Decimal(amount), currency='EUR',
+                                   date=date(2024, 5, day))
+        Expense.objects.create(user=self.user, amount=Decimal('5.00'), date=date(2024, 5, 4))
+
+        in_sql = Expense.objects.order_by('date').annotate(base=in_base()).values_list('base', flat=True)
+        in_python = to_base(Expense.objects.order_by('date').values_list('amount', 'currency', 'date'))
+        # The 2nd carries the 1st's rate forward; the 4th is in the base currency.
+        self.assertEqual(in_python, [Decimal('11.00'), Decimal('3.66'), Decimal('1.30'), Decimal('5.00')])
+        self.assertEqual([Decimal(str(value)) for value in in_sql], in_python)
+
+    def test_through_must_be_a_date(self):
+        with self.assertRaises(CommandError):
+            call_command('import_exchange_rates', 'rates.csv', '--through', 'soon')
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='pager')
+        self.client.force_authenticate(self.user)
+        # Several rows share a date, and some of them are archived.
+        for i in range(9):
+            Expense.objects.create(user=self.user, amount=i + 1, date=date(2019 + i % 2 * 5, 1, 1 + i // 3))
+        call_command('archive_ledger', before=date(2020, 1, 1), stdout=StringIO())
+
+    def test_pages_cover_every_row_once(self):
+        seen, params = [], {'page_size': 2, 'include': 'expenses'}
+        while True:
+            response = self.client.get('/expenses/api/financial-overview/', params)
+            seen.extend((row['date'], row['id']) for row in response.data['expenses'])
+            cursor = response.data['next']['expenses']
+            if cursor is None:
+                break
+            params['expenses_cursor'] = cursor
+        self.assertEqual(len(seen), 9)
+        self.assertEqual(seen, sorted(set(seen), reverse=True))
+
+
+class RollupTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='rolling')
+        self.client.force_authenticate(self.user)
+        self.categories = [
+            ExpenseCategory.objects.create(user=self.user, name=name) for name in ('Food', 'Fuel')]
+        load_rates([('EUR', date(2024, 1, 1), Decimal('1.5'))], through=date(2024, 3, 31))
+
+    def snapshot(self):
+        return sorted(MonthlyRollup.objects.values_list(
+            'kind', 'user', 'month', 'category', 'total', 'count'), key=str)
+
+    def test_incremental_rollups_match_rebuild(self):
+        food, fuel = (category.pk for category in self.categories)
+        response = self.client.post('/expenses/api/expenses/bulk/', [
+            {'amount': '10.00', 'date': '2024-01-10', 'category': food},
+            {'amount': '20.00', 'currency': 'EUR', 'date': '2024-01-20', 'category': fuel},
+            {'amount': '5.00', 'date': '2024-02-01', 'category': food},
+        ], format='json')
+        ids = [row['id'] for row in response.data]
+        self.client.post('/expenses/api/incomes/', {'amount': '100.00', 'date': '2024-01-05'})
+        self.client.patch('/expenses/api/expenses/bulk/', [
+            {'id': ids[0], 'date': '2024-03-01'}, {'id': ids[1], 'category': food}], format='json')
+        self.client.delete(f'/expenses/api/expenses/{ids[2]}/')
+        self.client.delete(f'/expenses/api/categories/{fuel}/')
+
+        incremental = self.snapshot()
+        self.assertIn(('expense', self.user.pk, date(2024, 1, 1), food, Decimal('30.00'), 1), incremental)
+        rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+
+
+class SyncTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='syncing')
+        self.client.force_authenticate(self.user)
+        self.expenses = [
+            Expense.objects.create(user=self.user, amount=i + 1, date=date(2024, 1, 1 + i))
+            for i in range(3)]
+
+    @override_settings(EXPENSES_SYNC_OVERLAP=0)
+    def test_changes_since_token(self):
+        token = self.client.get('/expenses/api/sync/').data['token']
+        kept, updated, deleted = self.expenses
+        self.client.patch(f'/expenses/api/expenses/{updated.pk}/', {'amount': '9.00'})
+        self.client.delete(f'/expenses/api/expenses/{deleted.pk}/')
+
+        response = self.client.get('/expenses/api/sync/', {'since': token, 'include': 'expenses'})
+        self.assertFalse(response.data['full'])
+        self.assertEqual([row['id'] for row in response.data['expenses']['changed']], [updated.pk])
+        self.assertEqual(response.data['expenses']['deleted'], [deleted.pk])
+
+    def test_full_sync_is_paged(self):
+        income = Income.objects.create(user=self.user, amount=10, date=date(2024, 1, 1))
+        params = {'include': 'expenses,incomes', 'page_size': 2}
+        pages = [self.client.get('/expenses/api/sync/', params).data]
+        while pages[-1]['next']:
+            pages.append(self.client.get(
+                '/expenses/api/sync/', {**params, 'page': pages[-1]['next']}).data)
+
+        self.assertEqual([len(page['expenses']['changed']) + len(page['incomes']['changed'])
+                          for page in pages], [2, 2])
+        self.assertEqual(sorted(row['id'] for page in pages for row in page['expenses']['changed']),
+                         [expense.pk for expense in self.expenses])
+        self.assertEqual([row['id'] for row in pages[1]['incomes']['changed']], [income.pk])
+        self.assertTrue(all(page['full'] for page in pages))
+        self.assertEqual({page['token'] for page in pages}, {pages[0]['token']})
+
+        response = self.client.get('/expenses/api/sync/', {'page': 'nonsense'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(EXPENSES_SYNC_OVERLAP=0)
+    def test_archived_rows_are_tombstoned(self):
+        token = self.client.get('/expenses/api/sync/').data['token']
+        call_command('archive_ledger', before=date(2024, 1, 3), stdout=StringIO())
+
+        response = self.client.get('/expenses/api/sync/', {'since': token, 'include': 'expenses'})
+        self.assertEqual(response.data['expenses']['changed'], [])
+        self.assertEqual(response.data['expenses']['deleted'], [e.pk for e in self.expenses[:2]])
+
+
+class PartitionTests(APITestCase):
+    def test_needs_postgresql(self):
+        with self.assertRaisesMessage(CommandError, "Partitioning needs PostgreSQL"):
+            call_command('partition_ledger', stdout=StringIO())
+
+
+urlpatterns = [
+    path('expenses/', include('expenses.urls')),
+    path('async/overview/', async_views.financial_overview),
+    path('async/summary/', async_views.financial_summary),
+    path('async/export/', async_views.ledger_export),
+]
+
+
+# The async views run their sections on worker threads with their own
+# connections, which only see committed rows. The ledger points at
+# expenses.User, so tokens have to be issued for that model.
+@override_settings(ROOT_URLCONF=__name__, AUTH_USER_MODEL='expenses.User')
+class AsyncViewTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='async')
+        category = ExpenseCategory.objects.create(user=self.user, name='Food')
+        for i in range(5):
+            Expense.objects.create(user=self.user, category=category, amount=i + 1,
+                                   description=f'Lunch {i}', date=date(2024, 1, 1 + i))
+            Income.objects.create(user=self.user, amount=10, date=date(2024, 1, 1 + i))
+        self.auth = {'headers': {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}}
+        self.sync_client = APIClient()
+        self.sync_client.force_authenticate(self.user)
+
+    async def test_requires_a_valid_token(self):
+        response = await self.async_client.get('/async/summary/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response.headers)
+        response = await self.async_client.get(
+            '/async/summary/', headers={'Authorization': 'Bearer nonsense'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_applies_the_sync_views_throttles(self):
+        class Closed(BaseThrottle):
+            def allow_request(self, request, view):
+                return False
+
+            def wait(self):
+                return 30
+
+        with patch.object(FinancialSummaryView, 'throttle_classes', [Closed]):
+            response = await self.async_client.get('/async/summary/', **self.auth)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers['Retry-After'], '30')
+
+    async def test_payloads_match_sync_views(self):
+        for view, params in (('overview', {}), ('summary', {'group_by': 'category'})):
+            with self.subTest(view=view):
+                response = await self.async_client.get(f'/async/{view}/', params, **self.auth)
+                self.assertEqual(response.status_code, 200)
+                expected = await sync_to_async(self.sync_client.get)(
+                    f'/expenses/api/financial-{view}/', params)
+                self.assertEqual(json.loads(response.content), expected.json())
+
+    async def test_export_streams_every_row(self):
+        response = await self.async_client.get('/async/export/', {'file_format': 'csv'}, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertIn(b'Lunch 4', lines[-1])
+
+
+# Replicas are extra SQLite aliases mirroring the test database, as
+# settings.py configures them for tests; "down" names a file SQLite cannot
+# open. They are added in setUpClass, after the runner set the databases up,
+# so the class asks for "__all__" rather than naming them.
+REPLICAS = {'replica': {}, 'down': {'NAME': '/nonexistent/replica.sqlite3'}}
+
+
+@override_settings(EXPENSES_REPLICA_PIN_SECONDS=7, EXPENSES_REPLICA_RETRY_SECONDS=30)
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        primary = connections['default'].settings_dict
+        for alias, overrides in REPLICAS.items():
+            connections.settings[alias] = {
+                **primary, **overrides, 'TEST': {**primary['TEST'], 'MIRROR': 'default'}}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in REPLICAS:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+
+    def setUp(self):
+        self.user = User.objects.create(username='replicated')
+        Expense.objects.create(user=self.user, amount=5, date=date(2024, 1, 1))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.addCleanup(routers._down_until.clear)
+        self.addCleanup(cache.clear)
+
+    def analytics(self):
+        """Queries the analytics GET ran on the primary and the replica."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get('/expenses/api/category-analytics/')
+        self.assertEqual(response.status_code, 200)
+        return len(primary), len(replica)
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_reads_go_to_the_replica(self):
+        primary, replica = self.analytics()
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_writes_pin_the_user_to_the_primary(self):
+        with patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            response = self.client.post('/expenses/api/expenses/', {
+                'amount': '3.00', 'date': '2024-01-02', 'description': 'Pinned'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        cache_set.assert_any_call(routers.pin_key(self.user.pk), True, 7)
+        primary, replica = self.analytics()
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        cache.delete(routers.pin_key(self.user.pk))
+        self.assertEqual(self.analytics()[0], 0)
+
+    @override_settings(DATABASE_REPLICAS=['down'])
+    def test_unreachable_replica_is_skipped(self):
+        down = connections['down']
+        with patch.object(down, 'ensure_connection', wraps=down.ensure_connection) as connect, \
+                self.assertLogs('expense_tracker.requests', 'WARNING'):
+            self.assertGreater(self.analytics()[0], 0)
+            self.assertGreater(self.analytics()[0], 0)
+        self.assertEqual(connect.call_count, 1)
+
+        # Tried again once the retry window has passed.
+        routers._down_until['down'] = 0
+        with patch.object(down, 'ensure_connection', wraps=down.ensure_connection) as connect, \
+                self.assertLogs('expense_tracker.requests', 'WARNING'):
+            self.analytics()
+        connect.assert_called_once()
+
+
+class BulkDestroyTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='bulk')
+        self.client.force_authenticate(self.user)
+        self.category = ExpenseCategory.objects.create(user=self.user, name='Food')
+        self.expenses = [
+            Expense.objects.create(user=self.user, category=self.category, amount=i + 1,
+                                   date=date(2024, 1, 1 + i))
+            for i in range(3)]
+        Budget.objects.create(user=self.user, category=self.category, limit=100,
+                              start_date=date(2024, 1, 1), end_date=date(2024, 1, 31))
+        RecurringExpense.objects.create(user=self.user, category=self.category, amount=5,
+                                        recurrence_period='monthly', next_due_date=date(2024, 2, 1))
+
+    def rollups(self):
+        return sorted(MonthlyRollup.objects.values_list('kind', 'month', 'category', 'total', 'count'),
+                      key=str)
+
+    def test_expenses_are_accounted_once(self):
+        ids = [expense.pk for expense in self.expenses[:2]]
+        self.client.delete('/expenses/api/expenses/bulk/', {'ids': ids}, format='json')
+        self.assertEqual(sorted(Tombstone.objects.values_list('object_id', flat=True)), ids)
+        incremental = self.rollups()
+        self.assertEqual(incremental, [('expense', date(2024, 1, 1), self.category.pk, Decimal('3.00'), 1)])
+        rebuild()
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_categories_go_through_on_delete(self):
+        self.client.delete('/expenses/api/categories/bulk/', {'ids': [self.category.pk]}, format='json')
+        for model in (Expense, Budget, RecurringExpense):
+            self.assertFalse(model.objects.filter(category__isnull=False).exists())
+        self.assertEqual(list(Tombstone.objects.values_list('kind', 'object_id')),
+                         [('categories', self.category.pk)])
+        self.assertEqual(self.rollups(), [('expense', date(2024, 1, 1), None, Decimal('6.00'), 3)])
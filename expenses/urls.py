@@ -1,9 +1,61 @@
+from django.conf import settings
 from django.urls import path
-from .views import FinancialOverviewView
+from rest_framework.routers import SimpleRouter
+from .views import (
+    ExpenseViewSet,
+    IncomeViewSet,
+    SavingsViewSet,
+    BudgetViewSet,
+    RecurringExpenseViewSet,
+    CategoryViewSet,
+    FinancialOverviewView,
+    FinancialSummaryView,
+    BudgetStatusView,
+    CategoryAnalyticsView,
+    LedgerSearchView,
+    ExpenseImportView,
+    LedgerExportView,
+    LedgerSyncView,
+)
+
+if getattr(settings, 'EXPENSES_ASYNC_VIEWS', False):
+    # ASGI deployments: the read endpoints run natively on the event loop.
+    from . import async_views
+    financial_overview = async_views.financial_overview
+    financial_summary = async_views.financial_summary
+    budget_status = async_views.budget_status_view
+    ledger_export = async_views.ledger_export
+else:
+    financial_overview = FinancialOverviewView.as_view()
+    financial_summary = FinancialSummaryView.as_view()
+    budget_status = BudgetStatusView.as_view()
+    ledger_export = LedgerExportView.as_view()
+
+router = SimpleRouter()
+router.register('api/expenses', ExpenseViewSet, basename='expense')
+router.register('api/incomes', IncomeViewSet, basename='income')
+router.register('api/savings', SavingsViewSet, basename='savings')
+router.register('api/budgets', BudgetViewSet, basename='budget')
+router.register('api/recurring-expenses', RecurringExpenseViewSet, basename='recurring-expense')
+router.register('api/categories', CategoryViewSet, basename='category')
 
 urlpatterns = [
 
-    path('api/financial-overview/', FinancialOverviewView.as_view(),
+    path('api/financial-overview/', financial_overview,
          name='financial_overview'),
+    path('api/financial-summary/', financial_summary,
+         name='financial_summary'),
+    path('api/budget-status/', budget_status,
+         name='budget_status'),
+    path('api/category-analytics/', CategoryAnalyticsView.as_view(),
+         name='category_analytics'),
+    path('api/search/', LedgerSearchView.as_view(),
+         name='ledger_search'),
+    path('api/expenses/import/', ExpenseImportView.as_view(),
+         name='expense_import'),
+    path('api/export/', ledger_export,
+         name='ledger_export'),
+    path('api/sync/', LedgerSyncView.as_view(),
+         name='ledger_sync'),
 
-]
+] + router.urls
@@ -1,29 +1,485 @@
+import copy
+
+from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import Expense, Income, Savings, Budget
-from .serializers import ExpenseSerializer, IncomeSerializer, SavingsSerializer, BudgetSerializer
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework import status
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from expense_tracker.routers import ReplicaReadMixin, read_alias
+from . import rollups, search, sync
+from .models import (
+    ARCHIVED_MODELS,
+    CATEGORIZED_MODELS,
+    Expense,
+    Income,
+    Savings,
+    Budget,
+)
+from .caching import (
+    bump_ledger_version_on_commit,
+    etag_matches,
+    get_ledger_version,
+    overview_cache_key,
+    overview_cache_timeout,
+)
+from .exports import FORMATS as EXPORT_FORMATS, stream_export
+from .imports import guess_format, import_expenses, iter_rows
+from .pagination import KeysetPagination
+from .projections import project_goals
+from .reports import (
+    SUMMARY_MODELS,
+    budget_status,
+    can_use_rollups,
+    category_analytics,
+    summarize_rollups,
+    summarize_tables,
+)
+from .signals import batched_deletes
+from .serializers import (
+    ExpenseSerializer,
+    IncomeSerializer,
+    SavingsSerializer,
+    BudgetSerializer,
+    SummaryQuerySerializer,
+    PeriodSummarySerializer,
+    CategorySummarySerializer,
+    BudgetStatusSerializer,
+    BudgetStatusQuerySerializer,
+    CategoryAnalyticsSerializer,
+    CategoryAnalyticsQuerySerializer,
+    SavingsProjectionSerializer,
+    SavingsProjectionQuerySerializer,
+    ExpenseImportQuerySerializer,
+    ExportQuerySerializer,
+    SearchQuerySerializer,
+    FastSerializer,
+    CategorySerializer,
+    RecurringExpenseSerializer,
+    BulkDeleteSerializer,
+)
+
+
+def get_sections(request, available):
+    include = request.query_params.get('include')
+    if not include:
+        return list(available)
+
+    names = [name.strip() for name in include.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValidationError(
+            {'include': f"Unknown section(s): {', '.join(unknown)}."})
+    return names
 
 
-class FinancialOverviewView(APIView):
+class FinancialOverviewView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
+    # section name -> (model, serializer, date field used for the cursor)
+    sections = {
+        'expenses': (Expense, ExpenseSerializer, 'date'),
+        'incomes': (Income, IncomeSerializer, 'date'),
+        'savings': (Savings, SavingsSerializer, 'date'),
+        'budgets': (Budget, BudgetSerializer, 'start_date'),
+    }
+
     def get(self, request):
         user = request.user
 
         username = user.username
 
-        expenses = Expense.objects.filter(user=user)
-        incomes = Income.objects.filter(user=user)
-        savings = Savings.objects.filter(user=user)
-        budgets = Budget.objects.filter(user=user)
+        cache_key, etag = overview_cache_key(request, get_ledger_version(user.pk))
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        response_data = cache.get(cache_key)
+        if response_data is None:
+            response_data = {
+                "username": username,  # Include the username in the response
+                **self.get_overview(request),
+            }
+            cache.set(cache_key, response_data, overview_cache_timeout())
+
+        return Response(response_data, headers={'ETag': etag})
+
+    def get_overview(self, request):
+        response_data = {}
+        next_cursors = {}
+
+        for name in get_sections(request, self.sections):
+            response_data[name], next_cursors[name] = self.get_section(request, name)
+
+        response_data["next"] = next_cursors
+
+        return response_data
+
+    def get_section(self, request, name):
+        model, serializer_class, date_field = self.sections[name]
+        paginator = KeysetPagination(date_field)
+        querysets = [model.objects.filter(user=request.user)]
+        if model in ARCHIVED_MODELS:
+            querysets.append(ARCHIVED_MODELS[model].objects.filter(user=request.user))
+
+        if getattr(settings, 'EXPENSES_FAST_SERIALIZATION', False):
+            serializer = FastSerializer(serializer_class)
+            rows, next_cursor = paginator.paginate_querysets(
+                [serializer.values(queryset) for queryset in querysets],
+                request, f'{name}_cursor')
+            return serializer.to_representation(rows), next_cursor
+
+        rows, next_cursor = paginator.paginate_querysets(
+            querysets, request, f'{name}_cursor')
+        return serializer_class(rows, many=True).data, next_cursor
 
-        response_data = {
-            "username": username,  # Include the username in the response
-            "expenses": ExpenseSerializer(expenses, many=True).data,
-            "incomes": IncomeSerializer(incomes, many=True).data,
-            "savings": SavingsSerializer(savings, many=True).data,
-            "budgets": BudgetSerializer(budgets, many=True).data,
-        }
+
+class FinancialSummaryView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_query(self, request):
+        query = SummaryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return query.validated_data
+
+    def get_available(self, group_by):
+        if group_by == 'category':
+            # Only expenses carry a category.
+            return {'expenses': SUMMARY_MODELS['expenses']}
+        return SUMMARY_MODELS
+
+    def get(self, request):
+        query = self.get_query(request)
+
+        response_data = {"group_by": query['group_by']}
+        for name in get_sections(request, self.get_available(query['group_by'])):
+            response_data[name] = self.get_section(request, name, query)
 
         return Response(response_data)
+
+    def get_section(self, request, name, query):
+        group_by = query['group_by']
+        start = query.get('start')
+        end = query.get('end')
+
+        if can_use_rollups(name, group_by, start, end):
+            rows = summarize_rollups(request.user, name, group_by, start, end)
+        else:
+            model = SUMMARY_MODELS[name]
+            tables = [model, ARCHIVED_MODELS[model]] if model in ARCHIVED_MODELS else [model]
+            querysets = []
+            for table in tables:
+                queryset = table.objects.filter(user=request.user)
+                if start:
+                    queryset = queryset.filter(date__gte=start)
+                if end:
+                    queryset = queryset.filter(date__lte=end)
+                querysets.append(queryset)
+            rows = summarize_tables(querysets, group_by)
+
+        if group_by == 'category':
+            return CategorySummarySerializer(rows, many=True).data
+        return PeriodSummarySerializer(rows, many=True).data
+
+
+class BudgetStatusView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_on(self, request):
+        query = BudgetStatusQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return query.validated_data.get('on') or timezone.localdate()
+
+    def get(self, request):
+        on = self.get_on(request)
+
+        budgets = budget_status(request.user, on)
+
+        return Response({
+            "on": on,
+            "budgets": BudgetStatusSerializer(budgets, many=True).data,
+        })
+
+
+class CategoryAnalyticsView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = CategoryAnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        rows = category_analytics(request.user, **query.validated_data)
+
+        return Response({"categories": CategoryAnalyticsSerializer(rows, many=True).data})
+
+
+class LedgerSearchView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = SearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        section = query.validated_data['section']
+
+        mode, rows = search.search(
+            request.user, section, query.validated_data['q'], query.validated_data['limit'])
+
+        _, serializer_class = search.SEARCH_SECTIONS[section]
+        return Response({
+            "section": section,
+            "mode": mode,
+            "results": serializer_class(rows, many=True).data,
+        })
+
+
+class ExpenseImportView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        serializer = ExpenseImportQuerySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data['file']
+        fmt = serializer.validated_data.get('format') or guess_format(upload.name)
+
+        result = import_expenses(request.user, iter_rows(upload, fmt))
+
+        # The report says which rows made it in, even when the upload failed.
+        failed = not result['complete'] or not result['created']
+        return Response(
+            result, status=status.HTTP_400_BAD_REQUEST if failed else status.HTTP_201_CREATED)
+
+
+class LedgerExportView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_export(self, request):
+        query = ExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return query.validated_data['section'], query.validated_data['file_format']
+
+    def get(self, request):
+        section, fmt = self.get_export(request)
+
+        # The body is read after the view returns, outside its read_alias.
+        response = StreamingHttpResponse(
+            stream_export(request.user, section, fmt, read_alias.get()),
+            content_type=EXPORT_FORMATS[fmt],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{section}.{fmt}"'
+        return response
+
+
+class LedgerSyncView(APIView):
+    """
+    Delta sync: ``since`` is the token from the previous response, and only
+    rows changed or deleted after it are returned. A full sync is paged:
+    ``next`` is passed back as ``page`` (with the same ``include``) until it
+    is null.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        since = sync.decode_token(since) if since else None
+        sections = get_sections(request, sync.SYNC_SECTIONS)
+        page_size = KeysetPagination().get_page_size(request)
+
+        token, full, data, next_page = sync.get_changes(
+            request.user, sections, since, request.query_params.get('page'), page_size)
+
+        return Response({"token": token, "full": full, "next": next_page, **data})
+
+
+class LedgerViewSet(viewsets.ModelViewSet):
+    """
+    CRUD for one of the user's ledger models, plus ``bulk/`` which takes a
+    list of rows and creates (POST), updates (PATCH) or deletes (DELETE)
+    all of them in one transaction with a constant number of queries.
+    """
+    permission_classes = [IsAuthenticated]
+    # Field the list endpoint pages on, or None for an unpaginated list.
+    date_field = 'date'
+
+    def get_queryset(self):
+        return self.serializer_class.Meta.model.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        if self.date_field is None:
+            return super().list(request, *args, **kwargs)
+
+        rows, next_cursor = KeysetPagination(self.date_field).paginate_queryset(
+            self.get_queryset(), request, 'cursor')
+        return Response({
+            "results": self.get_serializer(rows, many=True).data,
+            "next": next_cursor,
+        })
+
+    def get_batch(self, request):
+        rows = request.data
+        if not isinstance(rows, list) or not rows:
+            raise ValidationError({'detail': 'Expected a non-empty list of rows.'})
+        max_batch_size = getattr(settings, 'EXPENSES_MAX_BATCH_SIZE', 1000)
+        if len(rows) > max_batch_size:
+            raise ValidationError(
+                {'detail': f'At most {max_batch_size} rows per batch.'})
+        return rows
+
+    def after_bulk_write(self, created=(), deleted=()):
+        rollups.record(created)
+        rollups.record(deleted, sign=-1)
+        bump_ledger_version_on_commit(self.request.user.pk)
+
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        if request.method == 'POST':
+            return self.bulk_create(request)
+        if request.method == 'PATCH':
+            return self.bulk_update(request)
+        return self.bulk_destroy(request)
+
+    def bulk_create(self, request):
+        serializer = self.get_serializer(data=self.get_batch(request), many=True)
+        serializer.is_valid(raise_exception=True)
+
+        model = self.serializer_class.Meta.model
+        objs = [model(user=request.user, **row) for row in serializer.validated_data]
+        with transaction.atomic():
+            model.objects.bulk_create(objs)
+            self.after_bulk_write(created=objs)
+
+        return Response(self.get_serializer(objs, many=True).data, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request):
+        rows = self.get_batch(request)
+        try:
+            ids = [int(row['id']) for row in rows]
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError({'detail': 'Every row needs an integer id.'})
+        if len(set(ids)) != len(ids):
+            raise ValidationError({'detail': 'Duplicate ids in batch.'})
+
+        with transaction.atomic():
+            instances = self.get_queryset().select_for_update().in_bulk(ids)
+            missing = [pk for pk in ids if pk not in instances]
+            if missing:
+                raise ValidationError({'detail': f'Unknown ids: {missing}.'})
+
+            # One context for every row so lookups (e.g. categories) are shared.
+            context = self.get_serializer_context()
+            previous, changed, errors = [], set(), []
+            for row in rows:
+                instance = instances[int(row['id'])]
+                serializer = self.serializer_class(instance, data=row, partial=True, context=context)
+                if not serializer.is_valid():
+                    errors.append({'id': instance.pk, 'errors': serializer.errors})
+                    continue
+                previous.append(copy.copy(instance))
+                for field, value in serializer.validated_data.items():
+                    setattr(instance, field, value)
+                    changed.add(field)
+            if errors:
+                raise ValidationError(errors)
+
+            objs = list(instances.values())
+            if changed:
+                # bulk_update() skips auto_now, so stamp the rows by hand.
+                now = timezone.now()
+                for obj in objs:
+                    obj.updated_at = now
+                self.serializer_class.Meta.model.objects.bulk_update(
+                    objs, sorted(changed | {'updated_at'}))
+            self.after_bulk_write(created=objs, deleted=previous)
+
+        return Response(self.get_serializer(objs, many=True).data)
+
+    def bulk_destroy(self, request):
+        serializer = BulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            queryset = self.get_queryset().filter(id__in=serializer.validated_data['ids'])
+            deleted = list(queryset)
+            # The collector still handles on_delete; rollups, tombstones and
+            # the cache are updated once for the batch.
+            with batched_deletes():
+                queryset.delete()
+            sync.bury(deleted)
+            self.after_bulk_write(deleted=deleted)
+
+        return Response({"deleted": len(deleted)})
+
+
+class ExpenseViewSet(LedgerViewSet):
+    serializer_class = ExpenseSerializer
+
+
+class IncomeViewSet(LedgerViewSet):
+    serializer_class = IncomeSerializer
+
+
+class SavingsViewSet(LedgerViewSet):
+    serializer_class = SavingsSerializer
+
+    @action(detail=False)
+    def projections(self, request):
+        query = SavingsProjectionQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        on = query.validated_data.get('on') or timezone.localdate()
+
+        projection = project_goals(request.user, on, query.validated_data['months'])
+
+        return Response(SavingsProjectionSerializer(projection).data)
+
+
+class BudgetViewSet(LedgerViewSet):
+    serializer_class = BudgetSerializer
+    date_field = 'start_date'
+
+
+class RecurringExpenseViewSet(LedgerViewSet):
+    serializer_class = RecurringExpenseSerializer
+    date_field = 'next_due_date'
+
+    def after_bulk_write(self, created=(), deleted=()):
+        # Not part of the overview, rollups or cached responses.
+        pass
+
+
+class CategoryViewSet(LedgerViewSet):
+    serializer_class = CategorySerializer
+    date_field = None
+
+    def after_bulk_write(self, created=(), deleted=()):
+        bump_ledger_version_on_commit(self.request.user.pk)
+
+    def bulk_destroy(self, request):
+        serializer = BulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # What the delete signals would do per category (rollups to no
+        # category, sync stamps on the rows losing it, tombstones), done once
+        # for the batch; the collector applies SET_NULL.
+        with transaction.atomic():
+            queryset = self.get_queryset().filter(id__in=serializer.validated_data['ids'])
+            deleted = list(queryset)
+            ids = [category.pk for category in deleted]
+            rollups.uncategorize(ids)
+            now = timezone.now()
+            for model in CATEGORIZED_MODELS:
+                model.objects.filter(category__in=ids).update(updated_at=now)
+            with batched_deletes():
+                queryset.delete()
+            sync.bury(deleted)
+            self.after_bulk_write()
+
+        return Response({"deleted": len(deleted)})